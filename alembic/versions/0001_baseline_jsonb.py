@@ -0,0 +1,75 @@
+"""baseline schema; JSONB + GIN for instrument.metadata / raw_measurement.payload
+
+Databases bootstrapped with `make db-init` already have these tables (with JSON
+columns); for those the types are converted in place. Fresh databases get the
+tables created here.
+Offline (`--sql`) output assumes a fresh database.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-14
+"""
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+_SILVER = ("voltage_mean_10m", "current_mean_10m")
+
+
+def upgrade() -> None:
+    if context.is_offline_mode():
+        # `alembic upgrade --sql`: nothing to inspect, so emit the fresh-database DDL
+        insp, existing = None, set()
+    else:
+        insp = sa.inspect(op.get_bind())
+        existing = set(insp.get_table_names())
+
+    if "instrument" not in existing:
+        op.create_table(
+            "instrument",
+            sa.Column("id", sa.BigInteger, primary_key=True),
+            sa.Column("name", sa.String, nullable=True),
+            sa.Column("commissioned", sa.Boolean, nullable=True),
+            sa.Column("metadata", JSONB),
+        )
+    elif "metadata" in {c["name"] for c in insp.get_columns("instrument")}:
+        op.execute("ALTER TABLE instrument ALTER COLUMN metadata TYPE JSONB USING metadata::jsonb")
+    else:
+        op.add_column("instrument", sa.Column("metadata", JSONB))
+
+    if "raw_measurement" not in existing:
+        op.create_table(
+            "raw_measurement",
+            sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+            sa.Column("endpoint", sa.String, nullable=False),
+            sa.Column("instrument_id", sa.BigInteger, nullable=False),
+            sa.Column("payload", JSONB, nullable=False),
+            sa.Column("ingested_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_raw_instr_endpoint", "raw_measurement", ["instrument_id", "endpoint"])
+    else:
+        op.execute("ALTER TABLE raw_measurement ALTER COLUMN payload TYPE JSONB USING payload::jsonb")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_raw_payload_gin ON raw_measurement USING gin (payload)")
+
+    for name in _SILVER:
+        if name not in existing:
+            op.create_table(
+                name,
+                sa.Column("instrument_id", sa.BigInteger, primary_key=True),
+                sa.Column("ts_utc", sa.DateTime(timezone=True), primary_key=True),
+                sa.Column("phase", sa.String, primary_key=True),
+                sa.Column("value", sa.Float),
+                sa.Column("unit", sa.String),
+            )
+
+
+def downgrade() -> None:
+    # tables may predate this revision, so only the type/index changes are undone
+    op.execute("DROP INDEX IF EXISTS ix_raw_payload_gin")
+    op.execute("ALTER TABLE raw_measurement ALTER COLUMN payload TYPE JSON USING payload::json")
+    op.execute("ALTER TABLE instrument ALTER COLUMN metadata TYPE JSON USING metadata::json")
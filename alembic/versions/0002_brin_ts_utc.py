@@ -0,0 +1,31 @@
+"""BRIN indexes on silver ts_utc
+
+The sync and summary queries filter on `ts_utc >= now() - interval`. Silver rows
+arrive in time order, so a BRIN range map answers that at a fraction of a btree's
+size. (instrument_id, ts_utc) lookups are already covered by the primary key.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-14
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+_SILVER = ("voltage_mean_10m", "current_mean_10m")
+
+
+def upgrade() -> None:
+    for name in _SILVER:
+        op.execute(
+            f"CREATE INDEX IF NOT EXISTS brin_{name}_ts ON {name} "
+            "USING brin (ts_utc) WITH (pages_per_range = 32)"
+        )
+
+
+def downgrade() -> None:
+    for name in _SILVER:
+        op.execute(f"DROP INDEX IF EXISTS brin_{name}_ts")
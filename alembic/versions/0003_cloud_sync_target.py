@@ -0,0 +1,43 @@
+"""cloud sink: instrument.meta + unique upsert keys on the silver tables
+
+The cloud copy keeps the vendor record in instrument.meta (that's what
+/cloud/sync writes), and its upserts name (instrument_id, ts_utc, phase).
+These used to be re-applied by every /cloud/init call.
+
+Only applies with `-x target=cloud`; on the source DB it just stamps the version.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-14
+"""
+from alembic import context, op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+_SILVER = ("voltage_mean_10m", "current_mean_10m")
+
+
+def _is_cloud() -> bool:
+    return context.get_x_argument(as_dictionary=True).get("target") == "cloud"
+
+
+def upgrade() -> None:
+    if not _is_cloud():
+        return
+    op.execute("ALTER TABLE instrument ADD COLUMN IF NOT EXISTS meta JSONB")
+    for name in _SILVER:
+        op.execute(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS uq_{name} "
+            f"ON {name} (instrument_id, ts_utc, phase)"
+        )
+
+
+def downgrade() -> None:
+    if not _is_cloud():
+        return
+    for name in _SILVER:
+        op.execute(f"DROP INDEX IF EXISTS uq_{name}")
+    op.execute("ALTER TABLE instrument DROP COLUMN IF EXISTS meta")
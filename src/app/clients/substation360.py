@@ -1,17 +1,33 @@
 import os
 import ssl
+import asyncio
+import itertools
+import time
+import base64
+import threading
+import atexit
+import functools
+import contextlib
 import datetime as dt
 import httpx
+import orjson
 from loguru import logger
 from src.app.config import settings
-import json as _json
 
+try:
+    import fcntl
+except ImportError:  # non-POSIX: the token cache still works, just unlocked
+    fcntl = None
+
+@functools.lru_cache(maxsize=1)
 def _verify_arg():
     """
     Returns one of:
       - SSLContext with hostname relaxed (dev only), or
       - CA bundle path, or
       - bool verify flag
+    Memoized: settings are fixed for the process, and building the SSLContext
+    re-parses the CA bundle.
     """
     ca_path = settings.S360_CA_CERT_PATH if (settings.S360_CA_CERT_PATH and os.path.exists(settings.S360_CA_CERT_PATH)) else None
     if getattr(settings, "S360_TLS_RELAX_HOSTNAME", False):
@@ -20,8 +36,63 @@ def _verify_arg():
         return ctx
     return ca_path if ca_path else settings.S360_VERIFY_SSL
 
-def _auth_headers(token: str) -> dict:
-    return {"Authorization": f"Bearer {token}", "Accept": "application/json"}
+def _limits() -> httpx.Limits:
+    # idle connections outlive the gap between ingest calls (httpx's default is 5s)
+    return httpx.Limits(
+        max_connections=settings.S360_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.S360_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=settings.S360_HTTP_KEEPALIVE_EXPIRY,
+    )
+
+_CLIENT: httpx.Client | None = None
+
+def _client() -> httpx.Client:
+    """
+    Process-wide httpx.Client, built on first use.
+    Reusing it keeps the TCP+TLS connection alive across auth/list/telemetry calls;
+    HTTP/2 multiplexes requests on that one connection and HPACK-indexes the
+    repeated bearer header.
+    """
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = httpx.Client(
+            verify=_verify_arg(),
+            timeout=60,
+            limits=_limits(),
+            http2=True,
+            headers={"Accept": "application/json"},
+        )
+        atexit.register(_close_client)
+    return _CLIENT
+
+def _close_client() -> None:
+    global _CLIENT
+    if _CLIENT is not None:
+        _CLIENT.close()
+        _CLIENT = None
+
+def async_client() -> httpx.AsyncClient:
+    """
+    New httpx.AsyncClient with the same TLS settings as the shared sync client.
+    The caller owns it (use `async with`), so it can be scoped to one fan-out.
+    """
+    return httpx.AsyncClient(
+        verify=_verify_arg(),
+        timeout=60,
+        limits=_limits(),
+        http2=True,
+        headers={"Accept": "application/json"},
+    )
+
+# Per-request headers for the telemetry GETs. Content-Type can't live on the
+# client defaults: it would clobber the multipart boundary on the token POST.
+_JSON_BODY = {"Content-Type": "application/json"}
+
+def _use_token(client: httpx.Client | httpx.AsyncClient, token: str) -> None:
+    """Put the bearer on the client's default headers (only rewritten when it changes)."""
+    auth = f"Bearer {token}"
+    if client.headers.get("Authorization") != auth:
+        client.headers["Authorization"] = auth
 
 def _iso_z(value) -> str:
     """Return ISO-8601 with .000Z (Postman style) if given a datetime; pass through strings."""
@@ -30,10 +101,118 @@ def _iso_z(value) -> str:
         return value.strftime("%Y-%m-%dT%H:%M:%S.000Z")
     return str(value)
 
+# -------------------------
+# token cache (on disk, shared by CLI runs)
+# -------------------------
+_TOKEN_SKEW = 60  # seconds before `exp` at which a cached token is considered stale
+
+def _jwt_exp(token: str) -> float | None:
+    """`exp` claim of a JWT (unverified; we only need to know when to refresh)."""
+    try:
+        part = token.split(".")[1]
+        return float(orjson.loads(base64.urlsafe_b64decode(part + "=" * (-len(part) % 4)))["exp"])
+    except Exception:
+        return None
+
+@contextlib.contextmanager
+def _token_lock(path: str):
+    """Exclusive flock so parallel runs wait for one refresh instead of each re-authing."""
+    with open(path + ".lock", "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        yield  # released when the file closes
+
+def _read_cached_token(path: str) -> tuple[str, float] | None:
+    """(token, exp) from the cache file, or None on a miss; a malformed file counts as a miss."""
+    try:
+        with open(path, "rb") as f:
+            data = orjson.loads(f.read())
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict):
+        return None
+    if data.get("username") != settings.S360_USERNAME or data.get("auth_url") != settings.S360_AUTH_URL:
+        return None
+    try:
+        exp = float(data.get("exp") or 0)
+    except (TypeError, ValueError):
+        return None
+    token = data.get("token")
+    if exp - time.time() <= _TOKEN_SKEW or not token or not isinstance(token, str):
+        return None
+    return token, exp
+
+def _write_cached_token(path: str, token: str, exp: float) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)  # it's a credential
+    with os.fdopen(fd, "wb") as f:
+        f.write(orjson.dumps({
+            "username": settings.S360_USERNAME,
+            "auth_url": settings.S360_AUTH_URL,
+            "token": token,
+            "exp": exp,
+        }))
+    os.replace(tmp, path)  # atomic: readers never see a partial file
+
+# in-process layer in front of the file: a hit is a dict lookup, no open/flock/parse
+_TOKEN_MEM_SKEW = 30  # seconds before expiry at which the in-memory token is refreshed
+_TOKEN_MEM: dict[tuple[str, str], tuple[str, float]] = {}  # (username, auth_url) -> (token, exp)
+_TOKEN_MEM_LOCK = threading.Lock()
+
 def get_token() -> str:
+    """
+    Bearer token for the S360 API. Served from process memory until
+    _TOKEN_MEM_SKEW seconds before expiry; on a miss, _get_token_shared() is
+    called under a lock so concurrent callers wait for one refresh.
+    Expiry is the JWT `exp`, else the response's `expires_in`, else
+    S360_TOKEN_TTL_SECONDS from now.
+    """
+    key = (settings.S360_USERNAME, str(settings.S360_AUTH_URL))
+    with _TOKEN_MEM_LOCK:
+        hit = _TOKEN_MEM.get(key)
+        if hit is not None and hit[1] - time.time() > _TOKEN_MEM_SKEW:
+            return hit[0]
+        token, exp = _get_token_shared()
+        _TOKEN_MEM[key] = (token, exp if exp is not None else time.time() + settings.S360_TOKEN_TTL_SECONDS)
+        return token
+
+def _get_token_shared() -> tuple[str, float | None]:
+    """
+    (token, exp) from the on-disk cached JWT while it has more than
+    _TOKEN_SKEW seconds left, otherwise authenticates and caches the new one.
+    Cache problems (read-only home, etc.) just fall back to a fresh auth.
+    """
+    if not settings.S360_TOKEN_CACHE_PATH:
+        return _fetch_token()
+    path = os.path.expanduser(settings.S360_TOKEN_CACHE_PATH)
+    try:
+        os.makedirs(os.path.dirname(path) or ".", mode=0o700, exist_ok=True)
+        with _token_lock(path):
+            cached = _read_cached_token(path)
+            if cached:
+                _use_token(_client(), cached[0])
+                logger.info("S360 token reused from cache")
+                return cached
+            token, exp = _fetch_token()
+            if exp is not None:
+                _write_cached_token(path, token, exp)
+            return token, exp
+    except OSError as e:
+        logger.warning("S360 token cache unavailable ({}); authenticating", e)
+        return _fetch_token()
+
+def _post_auth(client: httpx.Client, **kwargs) -> httpx.Response:
+    """POST to the token endpoint with form credentials only: the shared client's
+    default bearer (usually the expired one being replaced) is stripped."""
+    req = client.build_request("POST", str(settings.S360_AUTH_URL), timeout=30, **kwargs)
+    req.headers.pop("Authorization", None)
+    return client.send(req)
+
+def _fetch_token() -> tuple[str, float | None]:
     """
     POST /api/token with multipart form-data (as in Postman).
     Falls back to x-www-form-urlencoded if the server rejects multipart.
+    Returns (token, exp) with exp as epoch seconds, or None if unknown.
     """
     payload = {
         "grant_type": "password",
@@ -41,21 +220,28 @@ def get_token() -> str:
         "username": settings.S360_USERNAME,
         "password": settings.S360_PASSWORD.get_secret_value(),
     }
-    verify = _verify_arg()
-    with httpx.Client(verify=verify, timeout=30) as client:
-        # 1) Try multipart/form-data (Postman behavior)
-        files = {k: (None, v) for k, v in payload.items()}
-        r = client.post(str(settings.S360_AUTH_URL), files=files)
-        if r.status_code == 415 or ("Unsupported Media Type" in r.text):
-            # 2) Fallback: application/x-www-form-urlencoded
-            r = client.post(str(settings.S360_AUTH_URL), data=payload)
-        r.raise_for_status()
-        data = r.json()
-        token = data.get("token") or data.get("access_token")
-        if not token:
-            raise RuntimeError(f"Auth OK but no token in response keys={list(data.keys())}")
-        logger.info("S360 token acquired")
-        return token
+    client = _client()
+    # 1) Try multipart/form-data (Postman behavior)
+    files = {k: (None, v) for k, v in payload.items()}
+    r = _post_auth(client, files=files)
+    if r.status_code == 415 or ("Unsupported Media Type" in r.text):
+        # 2) Fallback: application/x-www-form-urlencoded
+        r = _post_auth(client, data=payload)
+    r.raise_for_status()
+    data = orjson.loads(r.content)
+    token = data.get("token") or data.get("access_token")
+    if not token:
+        raise RuntimeError(f"Auth OK but no token in response keys={list(data.keys())}")
+    # keep the bearer on the shared client so later calls reuse it
+    _use_token(client, token)
+    logger.info("S360 token acquired ({})", r.http_version)
+    exp = _jwt_exp(token)
+    if exp is None and data.get("expires_in"):
+        try:
+            exp = time.time() + float(data["expires_in"])
+        except (TypeError, ValueError):
+            pass
+    return token, exp
 
 def list_instruments(token: str):
     """
@@ -63,17 +249,18 @@ def list_instruments(token: str):
     Accepts wrapper dicts like {items:[...]} or returns raw list.
     """
     url = f"{settings.S360_BASE_URL}/instrument"
-    with httpx.Client(verify=_verify_arg(), timeout=60) as client:
-        r = client.get(url, headers=_auth_headers(token))
-        r.raise_for_status()
-        data = r.json()
-        if isinstance(data, dict):
-            for k in ("items", "data", "results", "instruments"):
-                if k in data and isinstance(data[k], list):
-                    return data[k]
-        return data
-
-# src/app/clients/substation360.py
+    client = _client()
+    _use_token(client, token)
+    r = client.get(url)
+    r.raise_for_status()
+    return _unwrap_items(orjson.loads(r.content))
+
+def _unwrap_items(data):
+    if isinstance(data, dict):
+        for k in ("items", "data", "results", "instruments"):
+            if k in data and isinstance(data[k], list):
+                return data[k]
+    return data
 
 def voltage_mean_10min(token: str, instrument_ids: list[int], from_dt, to_dt):
     """
@@ -83,17 +270,13 @@ def voltage_mean_10min(token: str, instrument_ids: list[int], from_dt, to_dt):
     """
     url = f"{settings.S360_BASE_URL}/voltage/mean/30min"
     params = {"from": _iso_z(from_dt), "to": _iso_z(to_dt)}
-    headers = _auth_headers(token) | {"Content-Type": "application/json"}
-    verify = _verify_arg()
-    payload = list(instrument_ids)
-    with httpx.Client(verify=verify, timeout=60) as client:
-        try:
-            r = client.request("GET", url, headers=headers, params=params, json=payload)
-        except TypeError:
-            req = client.build_request("GET", url, headers=headers, params=params, content=_json.dumps(payload))
-            r = client.send(req)
-        r.raise_for_status()
-        return r.json()
+    # serialize the body ourselves: orjson is faster and emits compact bytes
+    body = orjson.dumps(list(instrument_ids))
+    client = _client()
+    _use_token(client, token)
+    r = client.request("GET", url, headers=_JSON_BODY, params=params, content=body)
+    r.raise_for_status()
+    return orjson.loads(r.content)
 
 def current_mean_10min(token: str, instrument_ids: list[int], from_dt, to_dt):
     """
@@ -103,14 +286,56 @@ def current_mean_10min(token: str, instrument_ids: list[int], from_dt, to_dt):
     """
     url = f"{settings.S360_BASE_URL}/current/mean/30min"
     params = {"from": _iso_z(from_dt), "to": _iso_z(to_dt)}
-    headers = _auth_headers(token) | {"Content-Type": "application/json"}
-    verify = _verify_arg()
-    payload = list(instrument_ids)
-    with httpx.Client(verify=verify, timeout=60) as client:
-        try:
-            r = client.request("GET", url, headers=headers, params=params, json=payload)
-        except TypeError:
-            req = client.build_request("GET", url, headers=headers, params=params, content=_json.dumps(payload))
-            r = client.send(req)
-        r.raise_for_status()
-        return r.json()
+    # serialize the body ourselves: orjson is faster and emits compact bytes
+    body = orjson.dumps(list(instrument_ids))
+    client = _client()
+    _use_token(client, token)
+    r = client.request("GET", url, headers=_JSON_BODY, params=params, content=body)
+    r.raise_for_status()
+    return orjson.loads(r.content)
+
+# -------------------------
+# async variants (bulk fan-out)
+# -------------------------
+async def _mean_30min_async(client: httpx.AsyncClient, path: str, token: str, instrument_ids: list[int], from_dt, to_dt):
+    url = f"{settings.S360_BASE_URL}/{path}"
+    params = {"from": _iso_z(from_dt), "to": _iso_z(to_dt)}
+    _use_token(client, token)
+    r = await client.request("GET", url, headers=_JSON_BODY, params=params, content=orjson.dumps(list(instrument_ids)))
+    r.raise_for_status()
+    return orjson.loads(r.content)
+
+async def voltage_mean_10min_async(client: httpx.AsyncClient, token: str, instrument_ids: list[int], from_dt, to_dt):
+    """Async twin of voltage_mean_10min; `client` comes from async_client()."""
+    return await _mean_30min_async(client, "voltage/mean/30min", token, instrument_ids, from_dt, to_dt)
+
+async def current_mean_10min_async(client: httpx.AsyncClient, token: str, instrument_ids: list[int], from_dt, to_dt):
+    """Async twin of current_mean_10min; `client` comes from async_client()."""
+    return await _mean_30min_async(client, "current/mean/30min", token, instrument_ids, from_dt, to_dt)
+
+async def list_instruments_async(client: httpx.AsyncClient, token: str):
+    """Async twin of list_instruments."""
+    _use_token(client, token)
+    r = await client.get(f"{settings.S360_BASE_URL}/instrument")
+    r.raise_for_status()
+    return _unwrap_items(orjson.loads(r.content))
+
+async def fetch_chunked(client: httpx.AsyncClient, fetch, token: str, instrument_ids: list[int],
+                        from_dt, to_dt, chunk_size: int | None = None) -> list:
+    """
+    Run `fetch` (one of the *_async fetchers) over `instrument_ids` in chunks of
+    `chunk_size` concurrently, at most S360_FETCH_CONCURRENCY in flight.
+    Rows come back flattened, in chunk order.
+    """
+    n = max(1, chunk_size or settings.S360_FETCH_CHUNK_SIZE)
+    sem = asyncio.Semaphore(settings.S360_FETCH_CONCURRENCY)
+
+    async def one(chunk):
+        async with sem:
+            r = await fetch(client, token, chunk, from_dt, to_dt)
+        return r if isinstance(r, list) else [r]
+
+    results = await asyncio.gather(*(
+        one(instrument_ids[k:k + n]) for k in range(0, len(instrument_ids), n)
+    ))
+    return list(itertools.chain.from_iterable(results))
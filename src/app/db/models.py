@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Boolean, JSON, DateTime, BigInteger, Index, Float
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, BigInteger, Index, Float
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from src.app.db.session import Base
 
@@ -9,16 +10,19 @@ class Instrument(Base):
     commissioned = Column(Boolean, nullable=True)
     # OLD (bad): metadata = Column(JSON)
     # NEW (good): Python attr 'meta' mapped to DB column 'metadata'
-    meta = Column("metadata", JSON)
+    meta = Column("metadata", JSONB)
 
 class RawMeasurement(Base):
     __tablename__ = "raw_measurement"
     id = Column(Integer, primary_key=True, autoincrement=True)
     endpoint = Column(String, nullable=False)
     instrument_id = Column(BigInteger, nullable=False)
-    payload = Column(JSON, nullable=False)
+    payload = Column(JSONB, nullable=False)
     ingested_at = Column(DateTime(timezone=True), server_default=func.now())
-    __table_args__ = (Index("ix_raw_instr_endpoint", "instrument_id", "endpoint"),)
+    __table_args__ = (
+        Index("ix_raw_instr_endpoint", "instrument_id", "endpoint"),
+        Index("ix_raw_payload_gin", "payload", postgresql_using="gin"),
+    )
 
 class VoltageMean10m(Base):
     __tablename__ = "voltage_mean_10m"
@@ -27,6 +31,10 @@ class VoltageMean10m(Base):
     phase = Column(String, primary_key=True)        # 'A','B','C','TOTAL'
     value = Column(Float)
     unit = Column(String)
+    __table_args__ = (
+        # rows arrive in time order: a BRIN range map serves `ts_utc >= ...` scans at a fraction of a btree's size
+        Index("brin_voltage_mean_10m_ts", "ts_utc", postgresql_using="brin", postgresql_with={"pages_per_range": 32}),
+    )
 
 class CurrentMean10m(Base):
     __tablename__ = "current_mean_10m"
@@ -35,3 +43,6 @@ class CurrentMean10m(Base):
     phase = Column(String, primary_key=True)
     value = Column(Float)
     unit = Column(String)
+    __table_args__ = (
+        Index("brin_current_mean_10m_ts", "ts_utc", postgresql_using="brin", postgresql_with={"pages_per_range": 32}),
+    )
@@ -1,18 +1,41 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from src.app.config import settings
 
-# engine = create_engine(settings.DATABASE_URL, future=True)
-# SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+# shared pool sizing for both sinks (ingest + cloud sync can overlap)
+_POOL = dict(
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+)
 
+# libpq TCP keepalives: a dead server is noticed in ~idle+30s without
+# the extra SELECT 1 round trip pre-ping costs on every checkout
+_LIBPQ_KEEPALIVES = dict(
+    keepalives=1,
+    keepalives_idle=settings.DB_TCP_KEEPALIVES_IDLE,
+    keepalives_interval=10,
+    keepalives_count=3,
+)
+_LIBPQ_DRIVERS = ("psycopg", "psycopg2")
+
+def _engine_kwargs(url: str) -> dict:
+    """_POOL, plus the keepalive connect_args when the driver is libpq-based (others reject them)."""
+    if make_url(url).get_driver_name() in _LIBPQ_DRIVERS:
+        return {**_POOL, "connect_args": _LIBPQ_KEEPALIVES}
+    return _POOL
 
 # Primary (already present)
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True, echo=settings.DB_ECHO)
+engine = create_engine(settings.DATABASE_URL, echo=settings.DB_ECHO, **_engine_kwargs(settings.DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, future=True)
 
 # Optional cloud sink
 if settings.ENABLE_CLOUD_SINK and settings.CLOUD_DB_URL:
-    cloud_engine = create_engine(settings.CLOUD_DB_URL, pool_pre_ping=True, echo=settings.CLOUD_DB_ECHO, future=True)
+    cloud_engine = create_engine(
+        settings.CLOUD_DB_URL, echo=settings.CLOUD_DB_ECHO, future=True, **_engine_kwargs(settings.CLOUD_DB_URL)
+    )
     CloudSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=cloud_engine, future=True)
 else:
     cloud_engine = None
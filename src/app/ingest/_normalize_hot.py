@@ -0,0 +1,146 @@
+"""
+Per-point hot helpers for normalize.py: timestamp detection, numeric
+extraction and phase classification.
+
+Kept free of SQLAlchemy/loguru and fully annotated so mypyc can compile it
+(`make build-hot`); the resulting extension module shadows this file on
+import. Without a build the module is imported as plain Python, unchanged.
+"""
+import re
+from typing import Any, Final
+
+# -------------------------
+# Timestamp detection
+# -------------------------
+_TS_KEYS = (
+    "timestamp", "timeUtc", "timestampUtc", "timeUTC", "ts", "time",
+    "endTimeUtc", "startTimeUtc", "periodEndUtc", "periodStartUtc",
+    "dateTime", "datetime", "readingTimeUtc", "time_utc", "timestampUTC",
+)
+
+def _detect_ts(d: dict[str, Any]) -> str | None:
+    # _TS_KEYS unrolled into one short-circuit chain (hot: runs on every node)
+    g = d.get
+    v = (
+        g("timestamp") or g("timeUtc") or g("timestampUtc") or g("timeUTC") or g("ts")
+        or g("time") or g("endTimeUtc") or g("startTimeUtc") or g("periodEndUtc")
+        or g("periodStartUtc") or g("dateTime") or g("datetime") or g("readingTimeUtc")
+        or g("time_utc") or g("timestampUTC")
+    )
+    return str(v) if v else None
+
+# -------------------------
+# Phase detection
+# -------------------------
+# Broader patterns: catch l1/l2/l3 even when glued to other words (e.g. 'voltageL1')
+_PAT_L1 = re.compile(r'(?:^|[^a-z0-9])l1(?:[^a-z0-9]|$)|voltagel1|currentl1|^l1|l1$', re.I)
+_PAT_L2 = re.compile(r'(?:^|[^a-z0-9])l2(?:[^a-z0-9]|$)|voltagel2|currentl2|^l2|l2$', re.I)
+_PAT_L3 = re.compile(r'(?:^|[^a-z0-9])l3(?:[^a-z0-9]|$)|voltagel3|currentl3|^l3|l3$', re.I)
+_PAT_A  = re.compile(r'(^|[^a-z0-9])phase?\s*a([^a-z0-9]|$)|voltage.*a|current.*a|(^|[^a-z0-9])a([^a-z0-9]|$)', re.I)
+_PAT_B  = re.compile(r'(^|[^a-z0-9])phase?\s*b([^a-z0-9]|$)|voltage.*b|current.*b|(^|[^a-z0-9])b([^a-z0-9]|$)', re.I)
+_PAT_C  = re.compile(r'(^|[^a-z0-9])phase?\s*c([^a-z0-9]|$)|voltage.*c|current.*c|(^|[^a-z0-9])c([^a-z0-9]|$)', re.I)
+
+# All six patterns folded into one anchored match. Each branch is a lookahead
+# over the whole key, tried in A -> B -> C order, so the winning phase is the
+# same as testing (L1|A), then (L2|B), then (L3|C) with re.search; the empty
+# named group tells us which branch hit (m.lastgroup).
+_PHASE_ONE = re.compile(
+    "|".join(
+        rf"(?=[\s\S]*?(?:{pl.pattern}|{pa.pattern}))(?P<{ph}>)"
+        for ph, pl, pa in (("A", _PAT_L1, _PAT_A), ("B", _PAT_L2, _PAT_B), ("C", _PAT_L3, _PAT_C))
+    ),
+    re.I,
+)
+
+# Key names repeat across every point of a payload, so classify each distinct
+# name once and serve the rest from this dict (regex only on first sight).
+_KEY_PHASE: dict[str, str | None] = {}
+_KEY_PHASE_MAX: Final = 4096  # guard against unbounded growth on odd payloads
+
+def _phase_of_key(key: str) -> str | None:
+    try:
+        return _KEY_PHASE[key]
+    except KeyError:
+        pass
+    m = _PHASE_ONE.match(str(key).lower())
+    ph = m.lastgroup if m else None
+    if len(_KEY_PHASE) >= _KEY_PHASE_MAX:
+        _KEY_PHASE.clear()
+    _KEY_PHASE[key] = ph
+    return ph
+
+# Normalize common labels to L1/L2/L3; “TOTAL”, “3-PHASE”, etc. map to TOTAL
+_SUBJ_TO_PHASE: dict[str, str] = {
+    "L1": "L1", "PHASE A": "L1", "A": "L1",
+    "L2": "L2", "PHASE B": "L2", "B": "L2",
+    "L3": "L3", "PHASE C": "L3", "C": "L3",
+    "TOTAL": "TOTAL", "3-PHASE": "TOTAL", "3PH": "TOTAL", "ALL": "TOTAL",
+}
+
+def _phase_from_subject(name: Any) -> str | None:
+    return _SUBJ_TO_PHASE.get(str(name).strip().upper())
+
+# vendor numeric fields in priority order
+_NUM_KEYS = ("numericData", "numericValue", "value", "mean", "avg", "average", "meanValue", "dataValue")
+
+def _numeric_value(d: dict[str, Any]) -> float | None:
+    """Try vendor numeric fields in priority order."""
+    # not an `or` chain: a legitimate 0.0 reading must not fall through
+    for k in _NUM_KEYS:
+        v = d.get(k)
+        if v in (None, ""):
+            continue
+        try:
+            return float(v)
+        except Exception:
+            continue
+    return None
+
+
+def _phase_values(d: dict[str, Any]) -> list[tuple[str, float]]:
+    """
+    Return [(phase, value), ...] from a point dict.
+    Priority:
+      1) subjectAssetName + numericX (your tenant's shape)
+      2) explicit ('phase', 'value'/'mean'...)
+      3) scan numeric keys for L1/L2/L3 or A/B/C (legacy shapes)
+      4) single numeric 'value' fallback -> TOTAL
+    """
+    out: list[tuple[str, float]] = []
+
+    # 1) subjectAssetName + numericData
+    subj = d.get("subjectAssetName") or d.get("subjectPhaseName") or d.get("channelName")
+    if subj:
+        ph = _phase_from_subject(subj)
+        val = _numeric_value(d)
+        if ph and val is not None:
+            out.append((ph, val))
+            return out
+
+    # 2) explicit phase + value/mean/avg
+    # its own Any-typed local: `ph` is str | None, and mypyc checks that at runtime
+    raw_ph: Any = d.get("phase") or d.get("Phase") or d.get("PHASE")
+    if raw_ph:
+        val = _numeric_value(d)
+        if val is not None:
+            out.append((str(raw_ph).strip().upper().replace("L", ""), val))
+            return out
+
+    # 3) scan numeric keys for matches (l1/l2/l3 or a/b/c embedded in key names)
+    for key, raw in d.items():
+        if raw is None:
+            continue
+        try:
+            f = float(raw)
+        except Exception:
+            continue
+        ph = _phase_of_key(key)
+        if ph:
+            out.append((ph, f))
+
+    # 4) single numeric 'value' fallback -> TOTAL
+    v = _numeric_value(d)
+    if not out and v is not None:
+        out.append(("TOTAL", v))
+
+    return out
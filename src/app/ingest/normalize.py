@@ -1,38 +1,127 @@
 from typing import Iterable, Iterator, Any
+import datetime as dt
 from loguru import logger
 from sqlalchemy import text
-import re
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from src.app.db.session import SessionLocal
+from src.app.db.models import VoltageMean10m, CurrentMean10m
+# compiled by `make build-hot` when available, plain Python otherwise
+from src.app.ingest._normalize_hot import _detect_ts, _phase_values
 
 # -------------------------
 # DB helper
 # -------------------------
-def _upsert(sql: str, rows: list[dict]) -> int:
+_COPY_THRESHOLD = 5000   # above this, stage with COPY and merge once
+
+_SILVER = {m.__tablename__: m.__table__ for m in (VoltageMean10m, CurrentMean10m)}
+_SILVER_COLS = ("instrument_id", "ts_utc", "phase", "value", "unit")
+
+def _upsert_stmt(tbl):
+    stmt = pg_insert(tbl)
+    return stmt.on_conflict_do_update(
+        index_elements=["instrument_id", "ts_utc", "phase"],
+        set_={"value": stmt.excluded.value, "unit": stmt.excluded.unit},
+    )
+
+# built once: executemany reuses SQLAlchemy's cached compile; the driver batches the rows
+_UPSERT_SQL = {name: _upsert_stmt(tbl) for name, tbl in _SILVER.items()}
+
+# Session-private staging table: temp tables are unlogged and ON COMMIT DELETE ROWS
+# empties it for the next batch on the same pooled connection. `seq` keeps arrival
+# order so the last duplicate wins, as it does with executemany.
+_STAGE_DDL = """
+CREATE TEMP TABLE IF NOT EXISTS {stage} (
+    seq bigserial, instrument_id bigint, ts_utc timestamptz,
+    phase text, value double precision, unit text
+) ON COMMIT DELETE ROWS;
+"""
+
+_MERGE_SQL = """
+INSERT INTO {table} (instrument_id, ts_utc, phase, value, unit)
+SELECT DISTINCT ON (instrument_id, ts_utc, phase) instrument_id, ts_utc, phase, value, unit
+FROM {stage}
+ORDER BY instrument_id, ts_utc, phase, seq DESC
+ON CONFLICT (instrument_id, ts_utc, phase)
+DO UPDATE SET value=EXCLUDED.value, unit=EXCLUDED.unit;
+"""
+
+_STAGE_TYPES = ["int8", "timestamptz", "text", "float8", "text"]
+
+# Naive timestamps are UTC on every write path: _typed_rows tags parsed ones, and
+# when a batch has to go to the server as text this makes it read them the same way.
+_UTC_SQL = text("SET LOCAL TIME ZONE 'UTC'")
+
+def _typed_rows(rows: list[tuple]) -> list[tuple] | None:
+    """
+    Rows with ts_utc as an aware datetime (naive ones taken as UTC), or None if a
+    timestamp isn't ISO-8601 (then the server parses text instead). Timestamps
+    repeat across phases and instruments, so each distinct string is parsed once.
+    """
+    parsed: dict[str, dt.datetime] = {}
+    out = []
+    try:
+        for i, t, p, v, u in rows:
+            ts = parsed.get(t)
+            if ts is None:
+                ts = dt.datetime.fromisoformat(t)
+                if ts.tzinfo is None:
+                    ts = ts.replace(tzinfo=dt.UTC)
+                parsed[t] = ts
+            out.append((i, ts, p, v, str(u)))
+    except ValueError:
+        return None
+    return out
+
+def _copy_upsert(s, table: str, rows: list[tuple], binary: bool) -> None:
+    """COPY rows into a temp stage table, then merge with one INSERT ... SELECT."""
+    stage = f"{table}_stage"
+    s.execute(text(_STAGE_DDL.format(stage=stage)))
+    raw = s.connection().connection.driver_connection  # psycopg 3 connection
+    copy_sql = f"COPY {stage} (instrument_id, ts_utc, phase, value, unit) FROM STDIN"
+    with raw.cursor() as cur:
+        if binary:
+            # native int8/timestamptz/float8: no str() on our side, no text parse server-side
+            with cur.copy(copy_sql + " (FORMAT BINARY)") as cp:
+                cp.set_types(_STAGE_TYPES)
+                for r in rows:
+                    cp.write_row(r)
+        else:
+            with cur.copy(copy_sql) as cp:
+                for r in rows:
+                    cp.write_row(r)
+    s.execute(text(_MERGE_SQL.format(table=table, stage=stage)))
+    s.execute(text(f"TRUNCATE {stage}"))  # next flush in this transaction starts empty
+
+def _values_upsert(s, table: str, rows: list[tuple]) -> None:
+    """
+    One executemany of the prebuilt ON CONFLICT upsert. psycopg 3 pipelines it and
+    psycopg2 folds it into multi-row VALUES pages, where a statement may not touch
+    the same key twice, so duplicates are folded first (last one wins, as row by row).
+    """
+    uniq = {r[:3]: r for r in rows}
+    s.execute(_UPSERT_SQL[table], [dict(zip(_SILVER_COLS, r)) for r in uniq.values()])
+
+def _upsert(s, table: str, rows: list[tuple]) -> int:
+    """
+    Upsert silver rows into `table` on session `s` (caller commits).
+    Small batches go through one executemany; large ones through COPY (psycopg 3 only).
+    """
     if not rows:
         return 0
-    with SessionLocal() as s:
-        for p in rows:
-            s.execute(text(sql), p)
-        s.commit()
+    bind = s.get_bind()
+    typed = _typed_rows(rows)
+    if typed is None and bind.dialect.name == "postgresql":
+        s.execute(_UTC_SQL)  # rest of this transaction
+    if len(rows) > _COPY_THRESHOLD and bind.dialect.driver == "psycopg":
+        _copy_upsert(s, table, typed or rows, binary=typed is not None)
+    else:
+        _values_upsert(s, table, typed or rows)
     return len(rows)
 
 # -------------------------
 # Generic recursive flattener
 # -------------------------
-_TS_KEYS = (
-    "timestamp", "timeUtc", "timestampUtc", "timeUTC", "ts", "time",
-    "endTimeUtc", "startTimeUtc", "periodEndUtc", "periodStartUtc",
-    "dateTime", "datetime", "readingTimeUtc", "time_utc", "timestampUTC",
-)
-
-def _detect_ts(d: dict) -> str | None:
-    for k in _TS_KEYS:
-        v = d.get(k)
-        if v not in (None, ""):
-            return str(v)
-    return None
-
 def _walk_points(obj: Any, iid: Any = None, unit: str | None = None, depth: int = 0) -> Iterator[dict]:
     """
     Recursively traverse obj. Yield any dict that looks like a time-series 'point':
@@ -63,106 +152,102 @@ def _walk_points(obj: Any, iid: Any = None, unit: str | None = None, depth: int
         for it in obj:
             yield from _walk_points(it, iid, unit, depth + 1)
 
-# -------------------------
-# Phase detection
-# -------------------------
-# Broader patterns: catch l1/l2/l3 even when glued to other words (e.g. 'voltageL1')
-_PAT_L1 = re.compile(r'(?:^|[^a-z0-9])l1(?:[^a-z0-9]|$)|voltagel1|currentl1|^l1|l1$', re.I)
-_PAT_L2 = re.compile(r'(?:^|[^a-z0-9])l2(?:[^a-z0-9]|$)|voltagel2|currentl2|^l2|l2$', re.I)
-_PAT_L3 = re.compile(r'(?:^|[^a-z0-9])l3(?:[^a-z0-9]|$)|voltagel3|currentl3|^l3|l3$', re.I)
-_PAT_A  = re.compile(r'(^|[^a-z0-9])phase?\s*a([^a-z0-9]|$)|voltage.*a|current.*a|(^|[^a-z0-9])a([^a-z0-9]|$)', re.I)
-_PAT_B  = re.compile(r'(^|[^a-z0-9])phase?\s*b([^a-z0-9]|$)|voltage.*b|current.*b|(^|[^a-z0-9])b([^a-z0-9]|$)', re.I)
-_PAT_C  = re.compile(r'(^|[^a-z0-9])phase?\s*c([^a-z0-9]|$)|voltage.*c|current.*c|(^|[^a-z0-9])c([^a-z0-9]|$)', re.I)
-
-
-
-def _phase_from_subject(name: str) -> str | None:
-    s = str(name).strip().upper()
-    # Normalize common labels to A/B/C
-    if s in ("L1", "PHASE A", "A"): return "L1"
-    if s in ("L2", "PHASE B", "B"): return "L2"
-    if s in ("L3", "PHASE C", "C"): return "L3"
-    # If “TOTAL”, “3-PHASE”, etc. shows up, treat as TOTAL
-    if s in ("TOTAL", "3-PHASE", "3PH", "ALL"): return "TOTAL"
-    return None
-
-def _numeric_value(d: dict):
-    """Try vendor numeric fields in priority order."""
-    for k in ("numericData", "numericValue", "value", "mean", "avg", "average", "meanValue", "dataValue"):
-        v = d.get(k)
-        if v in (None, ""):
-            continue
-        try:
-            return float(v)
-        except Exception:
+def _is_scalar_dict(d: dict) -> bool:
+    # plain loop, not any(<genexpr>): this runs once per point in _walk_points_fast
+    for v in d.values():
+        if isinstance(v, (dict, list)):
+            return False
+    return True
+
+def _is_fast_shape(rows: Any) -> bool:
+    """
+    True when the first row shows one of the two shapes S360 actually returns:
+      - flat:   [{time, instrumentId, subjectAssetName, numericData, ...}, ...]
+      - nested: [{instrumentId, unit?, values: [{time, ...}, ...]}, ...]
+    with scalar-only points, so nothing below them needs walking.
+    """
+    if not isinstance(rows, list) or not rows or not isinstance(rows[0], dict):
+        return False
+    first = rows[0]
+    if _detect_ts(first) is not None:
+        return _is_scalar_dict(first)
+    values = first.get("values")
+    if not isinstance(values, list) or not values or not isinstance(values[0], dict):
+        return False
+    if any(isinstance(v, (dict, list)) for k, v in first.items() if k != "values"):
+        return False
+    return _detect_ts(values[0]) is not None and _is_scalar_dict(values[0])
+
+def _with_ids(points: Iterator[dict]) -> Iterator[tuple[dict, Any, Any]]:
+    for d in points:
+        yield d, d.get("instrumentId") or d.get("instrument_id") or d.get("id"), d.get("unit") or d.get("units")
+
+def _walk_points_fast(rows: list) -> Iterator[tuple[dict, Any, Any]]:
+    """
+    Iterative walk for _is_fast_shape payloads. Yields (point, instrument_id, unit)
+    with the parent's id/unit applied, the same values _walk_points would have
+    written into a copy. The shape is re-checked per row and per point (only
+    rows[0] was sampled); anything with nested children goes through _walk_points.
+    """
+    detect_ts, scalar = _detect_ts, _is_scalar_dict
+    for parent in rows:
+        if not isinstance(parent, dict):
+            yield from _with_ids(_walk_points(parent, None, None, 1))
             continue
-    return None
-
-
-def _phase_values(d: dict) -> list[tuple[str, float]]:
-    """
-    Return [(phase, value), ...] from a point dict.
-    Priority:
-      1) subjectAssetName + numericX (your tenant's shape)
-      2) explicit ('phase', 'value'/'mean'...)
-      3) scan numeric keys for L1/L2/L3 or A/B/C (legacy shapes)
-      4) single numeric 'value' fallback -> TOTAL
-    """
-    out: list[tuple[str, float]] = []
-
-    # 1) subjectAssetName + numericData
-    subj = d.get("subjectAssetName") or d.get("subjectPhaseName") or d.get("channelName")
-    if subj:
-        ph = _phase_from_subject(subj)
-        val = _numeric_value(d)
-        if ph and val is not None:
-            out.append((ph, val))
-            return out
-
-    # 2) explicit phase + value/mean/avg
-    ph = d.get("phase") or d.get("Phase") or d.get("PHASE")
-    if ph:
-        val = _numeric_value(d)
-        if val is not None:
-            out.append((str(ph).strip().upper().replace("L", ""), val))
-            return out
-
-    # 3) scan numeric keys for matches (l1/l2/l3 or a/b/c embedded in key names)
-    for key, raw in d.items():
-        if raw is None:
+        g = parent.get
+        if detect_ts(parent) is not None:
+            if scalar(parent):
+                yield parent, g("instrumentId") or g("instrument_id") or g("id"), g("unit") or g("units")
+            else:
+                yield from _with_ids(_walk_points(parent, None, None, 1))
             continue
-        try:
-            f = float(raw)
-        except Exception:
+        values = g("values")
+        if not isinstance(values, list) or any(
+            isinstance(v, (dict, list)) for k, v in parent.items() if k != "values"
+        ):
+            yield from _with_ids(_walk_points(parent, None, None, 1))
             continue
-        k = str(key).lower()
-        if _PAT_L1.search(k) or _PAT_A.search(k):
-            out.append(("A", f)); continue
-        if _PAT_L2.search(k) or _PAT_B.search(k):
-            out.append(("B", f)); continue
-        if _PAT_L3.search(k) or _PAT_C.search(k):
-            out.append(("C", f)); continue
-
-    # 4) single numeric 'value' fallback -> TOTAL
-    v = _numeric_value(d)
-    if not out and v is not None:
-        out.append(("TOTAL", v))
-
-    return out
+        iid = g("instrumentId") or g("instrument_id") or g("id")
+        unit = g("unit") or g("units")
+        for v in values:
+            if isinstance(v, dict) and detect_ts(v) is not None and scalar(v):
+                vg = v.get
+                # parent values only fill keys the point doesn't carry (as _walk_points does)
+                yield (
+                    v,
+                    vg("instrumentId") or vg("instrument_id") or vg("id") or (None if "instrumentId" in v else iid),
+                    vg("unit") or vg("units") or (None if "unit" in v else unit),
+                )
+            else:
+                yield from _with_ids(_walk_points(v, iid, unit, 3))
+
+def _iter_points(rows: Any) -> Iterator[tuple[dict, Any, Any]]:
+    if _is_fast_shape(rows):
+        return _walk_points_fast(rows)
+    return _with_ids(_walk_points(rows))
 
 # -------------------------
 # Normalizers
 # -------------------------
-def normalize_voltage_mean_10min(rows: Iterable[dict]) -> int:
-    points = list(_walk_points(rows))
-    mapped: list[dict] = []
-    skipped = 0
+_FLUSH_ROWS = 10_000  # mapped rows buffered between writes
 
-    for p in points:
-        iid = p.get("instrumentId") or p.get("instrument_id") or p.get("id")
-        ts = _detect_ts(p)
-        unit = p.get("unit") or p.get("units") or "V"
-        phases = _phase_values(p)
+def _map_points(rows: Iterable[dict], default_unit: str, label: str) -> Iterator[list[tuple]]:
+    """
+    Flatten vendor rows into silver tuples (instrument_id, ts_utc, phase, value, unit)
+    in table column order, yielded in batches
+    of up to _FLUSH_ROWS so neither points nor mapped rows pile up in memory.
+    Shared by the voltage/current normalizers; globals are bound to locals
+    because this loop runs once per point.
+    """
+    # tuples, not dicts: a fraction of the memory, and written to COPY as-is
+    mapped: list[tuple] = []
+    append = mapped.append
+    detect_ts, phase_values = _detect_ts, _phase_values
+    total = skipped = 0
+
+    for p, iid, unit in _iter_points(rows):
+        ts = detect_ts(p)
+        phases = phase_values(p)
 
         if iid is None or ts is None or not phases:
             skipped += 1
@@ -174,55 +259,41 @@ def normalize_voltage_mean_10min(rows: Iterable[dict]) -> int:
             skipped += 1
             continue
 
+        unit = unit or default_unit
         for ph, val in phases:
-            mapped.append({"i": iid, "t": ts, "p": ph, "v": val, "u": unit})
+            append((iid, ts, ph, val, unit))
 
+        if len(mapped) >= _FLUSH_ROWS:
+            total += len(mapped)
+            yield mapped
+            mapped = []
+            append = mapped.append
+
+    total += len(mapped)
+    if mapped:
+        yield mapped
     if skipped:
-        logger.info(f"normalize_voltage_mean_10min: mapped={len(mapped)} skipped={skipped}")
+        logger.info(f"{label}: mapped={total} skipped={skipped}")
 
-    sql = """
-    INSERT INTO voltage_mean_10m (instrument_id, ts_utc, phase, value, unit)
-    VALUES (:i, :t, :p, :v, :u)
-    ON CONFLICT (instrument_id, ts_utc, phase)
-    DO UPDATE SET value=EXCLUDED.value, unit=EXCLUDED.unit;
+def _normalize(rows: Iterable[dict], table: str, default_unit: str, label: str, session=None) -> int:
     """
-    n = _upsert(sql, mapped)
-    logger.info(f"Normalized voltage rows inserted/updated: {n}")
+    Map and upsert batch by batch in one transaction: the caller's `session`
+    (the caller commits), or a session of our own committed on success.
+    """
+    if session is None:
+        with SessionLocal.begin() as s:
+            return _normalize(rows, table, default_unit, label, s)
+    n = 0
+    for batch in _map_points(rows, default_unit, label):
+        n += _upsert(session, table, batch)
     return n
 
-def normalize_current_mean_10min(rows: Iterable[dict]) -> int:
-    points = list(_walk_points(rows))
-    mapped: list[dict] = []
-    skipped = 0
-
-    for p in points:
-        iid = p.get("instrumentId") or p.get("instrument_id") or p.get("id")
-        ts = _detect_ts(p)
-        unit = p.get("unit") or p.get("units") or "A"
-        phases = _phase_values(p)
-
-        if iid is None or ts is None or not phases:
-            skipped += 1
-            continue
-
-        try:
-            iid = int(iid)
-        except Exception:
-            skipped += 1
-            continue
-
-        for ph, val in phases:
-            mapped.append({"i": iid, "t": ts, "p": ph, "v": val, "u": unit})
-
-    if skipped:
-        logger.info(f"normalize_current_mean_10min: mapped={len(mapped)} skipped={skipped}")
+def normalize_voltage_mean_10min(rows: Iterable[dict], session=None) -> int:
+    n = _normalize(rows, "voltage_mean_10m", "V", "normalize_voltage_mean_10min", session)
+    logger.info(f"Normalized voltage rows inserted/updated: {n}")
+    return n
 
-    sql = """
-    INSERT INTO current_mean_10m (instrument_id, ts_utc, phase, value, unit)
-    VALUES (:i, :t, :p, :v, :u)
-    ON CONFLICT (instrument_id, ts_utc, phase)
-    DO UPDATE SET value=EXCLUDED.value, unit=EXCLUDED.unit;
-    """
-    n = _upsert(sql, mapped)
+def normalize_current_mean_10min(rows: Iterable[dict], session=None) -> int:
+    n = _normalize(rows, "current_mean_10m", "A", "normalize_current_mean_10min", session)
     logger.info(f"Normalized current rows inserted/updated: {n}")
     return n
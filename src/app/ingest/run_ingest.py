@@ -1,17 +1,44 @@
-import json, argparse, datetime as dt
+import json, argparse, asyncio, datetime as dt
+from concurrent.futures import ThreadPoolExecutor
 from dateutil import tz
 from loguru import logger
-from src.app.clients.substation360 import get_token, list_instruments
+from src.app.clients.substation360 import (
+    get_token, list_instruments, async_client, fetch_chunked,
+    voltage_mean_10min_async, current_mean_10min_async,
+)
+from src.app.config import settings
 from src.app.db.session import SessionLocal
 from src.app.db.models import Instrument as DBInstrument
+from src.app.ingest.normalize import normalize_voltage_mean_10min, normalize_current_mean_10min
 
 def _iso_utc(dt_obj): return dt_obj.replace(tzinfo=tz.UTC).isoformat().replace("+00:00","Z")
 
+def _instrument_ids(inst, limit: int | None) -> list[int]:
+    ids: list[int] = []
+    for i in inst:
+        v = i.get("instrumentId") or i.get("id")
+        if v is None:
+            continue
+        ids.append(int(v))
+        if limit and len(ids) >= limit:
+            break
+    return ids
+
+async def _fetch_all(fetch, token: str, ids: list[int], from_dt, to_dt, chunk_size: int) -> list:
+    async with async_client() as client:
+        return await fetch_chunked(client, fetch, token, ids, from_dt, to_dt, chunk_size)
+
 def main():
     parser = argparse.ArgumentParser()
     sub = parser.add_subparsers(dest="cmd", required=True)
     sub.add_parser("auth")
     sub.add_parser("instruments")
+    for name in ("voltage_mean_30min", "current_mean_30min", "mean_30min"):
+        p = sub.add_parser(name)
+        p.add_argument("--hours", type=int, default=2)
+        p.add_argument("--limit", type=int, default=None, help="max instruments (default: all)")
+        p.add_argument("--chunk-size", type=int, default=settings.S360_FETCH_CHUNK_SIZE,
+                       help="instrument IDs per upstream request")
     args = parser.parse_args()
 
     token = get_token()
@@ -32,6 +59,51 @@ def main():
             s.commit()
         logger.success(f"Upserted {len(inst)} instruments to DB")
         print(json.dumps(inst[:5], indent=2))
+        return
+
+    if args.cmd in ("voltage_mean_30min", "current_mean_30min"):
+        fetch, normalize = (
+            (voltage_mean_10min_async, normalize_voltage_mean_10min)
+            if args.cmd == "voltage_mean_30min" else
+            (current_mean_10min_async, normalize_current_mean_10min)
+        )
+        ids = _instrument_ids(list_instruments(token), args.limit)
+        if not ids:
+            logger.warning("No instrument IDs could be extracted; skipping fetch")
+            return
+        to_ts = dt.datetime.now(tz.UTC)
+        from_ts = to_ts - dt.timedelta(hours=args.hours)
+        rows = asyncio.run(_fetch_all(fetch, token, ids, from_ts, to_ts, max(1, args.chunk_size)))
+        n = normalize(rows)
+        logger.success(f"{args.cmd}: instruments={len(ids)} fetched={len(rows)} normalized={n}")
+        return
+
+    if args.cmd == "mean_30min":
+        # voltage + current together: fetches share one event loop, and the two
+        # normalizers overlap (one maps points while the other waits on COPY/upsert I/O)
+        ids = _instrument_ids(list_instruments(token), args.limit)
+        if not ids:
+            logger.warning("No instrument IDs could be extracted; skipping fetch")
+            return
+        to_ts = dt.datetime.now(tz.UTC)
+        from_ts = to_ts - dt.timedelta(hours=args.hours)
+        chunk = max(1, args.chunk_size)
+
+        async def _both():
+            return await asyncio.gather(
+                _fetch_all(voltage_mean_10min_async, token, ids, from_ts, to_ts, chunk),
+                _fetch_all(current_mean_10min_async, token, ids, from_ts, to_ts, chunk),
+            )
+        v_rows, c_rows = asyncio.run(_both())
+
+        with ThreadPoolExecutor(2) as ex:
+            fv = ex.submit(normalize_voltage_mean_10min, v_rows)
+            fc = ex.submit(normalize_current_mean_10min, c_rows)
+            nv, nc = fv.result(), fc.result()
+        logger.success(
+            f"{args.cmd}: instruments={len(ids)} fetched={len(v_rows)}/{len(c_rows)} "
+            f"normalized={nv}/{nc} (voltage/current)"
+        )
 
 if __name__ == "__main__":
     main()
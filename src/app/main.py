@@ -1,15 +1,19 @@
+import asyncio
+import contextlib
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from loguru import logger
-from sqlalchemy import text
+from pydantic import BaseModel
+from sqlalchemy import text, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 import datetime as dt
 from datetime import UTC
-from src.app.sync.cloud import cloud_health, cloud_init, sync as cloud_sync
+from src.app.sync.cloud import cloud_health, cloud_init, sync as cloud_sync, SYNC_TABLES
 from src.app.config import settings
 
 from src.app.clients.substation360 import (
-    get_token, list_instruments,
-    voltage_mean_10min, current_mean_10min
+    get_token, async_client, fetch_chunked, list_instruments_async,
+    voltage_mean_10min_async, current_mean_10min_async
 )
 from src.app.db.session import SessionLocal
 from src.app.db.models import Instrument as DBInstrument, RawMeasurement
@@ -17,7 +21,20 @@ from src.app.ingest.normalize import (
     normalize_voltage_mean_10min, normalize_current_mean_10min
 )
 
-app = FastAPI(title="NPG Substation360 Pipeline Demo", version="0.1.3")
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    # one AsyncClient for the process: vendor calls share its HTTP/2 connection pool
+    app.state.http = async_client()
+    try:
+        yield
+    finally:
+        await app.state.http.aclose()
+
+# orjson (already used for the vendor payloads) serializes every route's response
+app = FastAPI(
+    title="NPG Substation360 Pipeline Demo", version="0.1.3",
+    lifespan=lifespan, default_response_class=ORJSONResponse,
+)
 
 @app.get("/healthz", summary="Healthz")
 def healthz():
@@ -37,17 +54,21 @@ def _as_list(raw):
         return [raw]
     return []
 
+# vendor id / display-name keys, in priority order
+_ID_KEYS = (
+    "instrumentId", "InstrumentId", "instrumentID", "instrument_id",
+    "id", "deviceId", "DeviceId", "assetId", "AssetId",
+)
+_NAME_KEYS = ("name", "instrumentName", "assetName", "displayName")
+
 def _iid(i: dict) -> int | None:
     """
     Extract an integer instrument id; the deployment you showed uses 'instrumentId'.
     Fall back to other common keys so this stays robust across tenants.
     """
-    for k in (
-        "instrumentId", "InstrumentId", "instrumentID", "instrument_id",
-        "id", "deviceId", "DeviceId", "assetId", "AssetId"
-    ):
-        v = i.get(k)
-        if v is not None:
+    for k in _ID_KEYS:
+        # `in` first: absent keys (the usual case past the first) cost one probe, no call
+        if k in i and (v := i[k]) is not None:
             try:
                 return int(v)
             except Exception:
@@ -60,46 +81,86 @@ def _iname(i: dict, iid: int | None) -> str | None:
     Derive a display name. Prefer vendor-provided names/tags; as a last resort
     synthesize 'instrument-<id>'.
     """
-    name = (
-        i.get("name")
-        or i.get("instrumentName")
-        or i.get("assetName")
-        or i.get("displayName")
-        or (i.get("transformerAssetTag") or "").strip()
-    )
+    for k in _NAME_KEYS:
+        if k in i and (name := i[k]):
+            return name
+    name = (i.get("transformerAssetTag") or "").strip()
     if name:
         return name
     return f"instrument-{iid}" if iid is not None else None
 
+_BRONZE_BATCH = 10_000  # raw rows per executemany
+
+def _rid(row: dict, default: int) -> int:
+    """Bronze instrument_id: the row's own id if it has a usable one, else `default` (already an int)."""
+    v = row.get("instrumentId") or row.get("instrument_id")
+    return int(v) if v else default
+
+def _store_bronze(s, endpoint: str, data: list[dict], default_iid: int) -> None:
+    """
+    Append raw vendor rows to raw_measurement with Core executemany in
+    _BRONZE_BATCH chunks (no per-instance ORM flush), on the caller's session.
+    """
+    stmt = insert(RawMeasurement.__table__)
+    rid = _rid
+    for k in range(0, len(data), _BRONZE_BATCH):
+        s.execute(stmt, [
+            {"endpoint": endpoint, "instrument_id": rid(row, default_iid), "payload": row}
+            for row in data[k:k + _BRONZE_BATCH]
+        ])
+
+def _persist(endpoint: str, data: list[dict], default_iid: int, normalize) -> int:
+    """Bronze insert + silver normalize on one connection, committed together."""
+    with SessionLocal.begin() as s:
+        _store_bronze(s, endpoint, data, default_iid)
+        return normalize(data, session=s)
+
+def _instrument_upsert_stmt():
+    stmt = pg_insert(DBInstrument.__table__)
+    return stmt.on_conflict_do_update(
+        index_elements=["id"],
+        set_={c: stmt.excluded[c] for c in ("name", "commissioned", "metadata")},
+    )
+
+# built once and executemany'd: no per-call compile, no 65535-parameter ceiling
+_INSTRUMENT_UPSERT = _instrument_upsert_stmt()
+
+def _upsert_instruments(instruments: list[dict]) -> int:
+    # keyed by id: a repeated id keeps its last record (ON CONFLICT can't touch a row twice)
+    by_id: dict[int, dict] = {}
+    for i in instruments:
+        iid = _iid(i)
+        if iid is None:
+            logger.warning("Skipping instrument without id; keys={}", list(i.keys()))
+            continue
+        by_id[iid] = {
+            "id": iid,
+            "name": _iname(i, iid),
+            "commissioned": i.get("commissioned") or i.get("isCommissioned"),
+            "metadata": i,  # keep full vendor record (ORM attr `meta`)
+        }
+
+    if by_id:
+        with SessionLocal.begin() as s:
+            s.execute(_INSTRUMENT_UPSERT, list(by_id.values()))
+    return len(by_id)
+
 # -----------------------
 # routes
 # -----------------------
+# Vendor I/O runs on the event loop (app.state.http); the blocking pieces
+# (token cache file, SQLAlchemy sessions) are pushed to worker threads.
 @app.post("/ingest/instruments", summary="Fetch & upsert instruments")
-def ingest_instruments():
-    token = get_token()
-    instruments = _as_list(list_instruments(token))
-
-    upserted = 0
-    with SessionLocal() as s:
-        for i in instruments:
-            iid = _iid(i)
-            if iid is None:
-                logger.warning("Skipping instrument without id; keys={}", list(i.keys()))
-                continue
-            rec = s.get(DBInstrument, iid) or DBInstrument(id=iid)
-            rec.name = _iname(i, iid)
-            rec.commissioned = i.get("commissioned") or i.get("isCommissioned")
-            rec.meta = i  # keep full vendor record
-            s.add(rec)
-            upserted += 1
-        s.commit()
-
+async def ingest_instruments():
+    token = await asyncio.to_thread(get_token)
+    instruments = _as_list(await list_instruments_async(app.state.http, token))
+    upserted = await asyncio.to_thread(_upsert_instruments, instruments)
     return {"received": len(instruments), "upserted": upserted}
 
 @app.post("/ingest/voltage-mean-10m", summary="Voltage mean (10m) bronze->silver")
-def ingest_voltage_mean_10m(hours: int = 2, limit: int = 3):
-    token = get_token()
-    instruments = _as_list(list_instruments(token))
+async def ingest_voltage_mean_10m(hours: int = 2, limit: int = 3):
+    token = await asyncio.to_thread(get_token)
+    instruments = _as_list(await list_instruments_async(app.state.http, token))
     # select up to `limit` ids
     ids: list[int] = []
     for i in instruments:
@@ -116,32 +177,22 @@ def ingest_voltage_mean_10m(hours: int = 2, limit: int = 3):
     from_ts = to_ts - dt.timedelta(hours=hours)
 
     try:
-        data = voltage_mean_10min(token, ids, from_ts, to_ts)
+        data = await fetch_chunked(app.state.http, voltage_mean_10min_async, token, ids, from_ts, to_ts)
     except Exception as e:
         # return JSON so curl | jq doesn't fail
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=502,
             content={"error": "upstream_voltage_fetch_failed", "detail": str(e)}
         )
 
-    # bronze
-    with SessionLocal() as s:
-        for row in data:
-            s.add(RawMeasurement(
-                endpoint="voltage/mean/30min",
-                instrument_id=int(row.get("instrumentId") or row.get("instrument_id") or ids[0]),
-                payload=row
-            ))
-        s.commit()
-
-    # silver
-    n = normalize_voltage_mean_10min(data)
+    # bronze + silver, one transaction
+    n = await asyncio.to_thread(_persist, "voltage/mean/30min", data, ids[0], normalize_voltage_mean_10min)
     return {"instrument_ids": ids, "fetched": len(data), "normalized": n}
 
 @app.post("/ingest/current-mean-10m", summary="Current mean (10m) bronze->silver")
-def ingest_current_mean_10m(hours: int = 2, limit: int = 3):
-    token = get_token()
-    instruments = _as_list(list_instruments(token))
+async def ingest_current_mean_10m(hours: int = 2, limit: int = 3):
+    token = await asyncio.to_thread(get_token)
+    instruments = _as_list(await list_instruments_async(app.state.http, token))
 
     ids: list[int] = []
     for i in instruments:
@@ -158,29 +209,30 @@ def ingest_current_mean_10m(hours: int = 2, limit: int = 3):
     from_ts = to_ts - dt.timedelta(hours=hours)
 
     try:
-        data = current_mean_10min(token, ids, from_ts, to_ts)
+        data = await fetch_chunked(app.state.http, current_mean_10min_async, token, ids, from_ts, to_ts)
     except Exception as e:
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=502,
             content={"error": "upstream_current_fetch_failed", "detail": str(e)}
         )
 
-    with SessionLocal() as s:
-        for row in data:
-            s.add(RawMeasurement(
-                endpoint="current/mean/30min",
-                instrument_id=int(row.get("instrumentId") or row.get("instrument_id") or ids[0]),
-                payload=row
-            ))
-        s.commit()
-
-    n = normalize_current_mean_10min(data)
+    # bronze + silver, one transaction
+    n = await asyncio.to_thread(_persist, "current/mean/30min", data, ids[0], normalize_current_mean_10min)
     return {"instrument_ids": ids, "fetched": len(data), "normalized": n}
 
-@app.get("/metrics/ingest-summary", summary="Rows ingested in last N hours")
+class TableCount(BaseModel):
+    table: str
+    rows: int
+
+class IngestSummary(BaseModel):
+    since_hours: int
+    tables: list[TableCount]
+
+@app.get("/metrics/ingest-summary", summary="Rows ingested in last N hours", response_model=IngestSummary)
 def ingest_summary(hours: int = 24):
+    # make_interval: a typed integer param instead of a text concat + ::interval cast
     q = text("""
-      with rng as (select now() - (:h||' hours')::interval as since)
+      with rng as (select now() - make_interval(hours => cast(:h as integer)) as since)
       select 'voltage_mean_10m' as table, count(*) as rows
         from voltage_mean_10m, rng where ts_utc >= rng.since
       union all
@@ -188,31 +240,34 @@ def ingest_summary(hours: int = 24):
         where ts_utc >= rng.since
     """)
     with SessionLocal() as s:
-        result = s.execute(q, {"h": hours})
-        rows = [dict(m) for m in result.mappings()]  # SQLAlchemy 2.x safe conversion
-    return {"since_hours": hours, "tables": rows}
+        rows = s.execute(q, {"h": hours}).mappings().all()
+    # RowMappings validate straight into TableCount and pydantic-core serializes them
+    return IngestSummary(since_hours=hours, tables=rows)
 
 @app.get("/cloud/healthz", summary="Cloud sink connectivity")
 def cloud_healthz():
     ok, msg = cloud_health()
     return {"enabled": settings.ENABLE_CLOUD_SINK, "ok": ok, "status": msg}
 
-@app.post("/cloud/init", summary="Create tables/indexes on cloud target")
+@app.post("/cloud/init", summary="Check cloud schema version (and set up FDW if enabled)")
 def cloud_init_route():
-    cloud_init()
-    return {"ok": True}
+    return cloud_init()
 
 @app.post("/cloud/sync", summary="Replicate recent rows to cloud target")
 def cloud_sync_route(tables: str = "instrument,voltage_mean_10m,current_mean_10m", since_hours: int = 24):
-    tlist = [t.strip() for t in tables.split(",") if t.strip()]
+    tlist = [t for t in (t.strip() for t in tables.split(",")) if t]
+    unknown = [t for t in tlist if t not in SYNC_TABLES]
+    if unknown:
+        # reject before any connection is opened
+        raise HTTPException(400, f"Unsupported table(s): {', '.join(unknown)}; expected {sorted(SYNC_TABLES)}")
     res = cloud_sync(tlist, since_hours=since_hours)
     return {"tables": tlist, "since_hours": since_hours, "copied_rows": res}
 
 @app.post("/ingest/voltage-mean-30m")
-def ingest_voltage_mean_30m_alias(hours: int = 2, limit: int = 3):
+async def ingest_voltage_mean_30m_alias(hours: int = 2, limit: int = 3):
     # delegate to the 10m handler
-    return ingest_voltage_mean_10m(hours=hours, limit=limit)
+    return await ingest_voltage_mean_10m(hours=hours, limit=limit)
 
 @app.post("/ingest/current-mean-30m")
-def ingest_current_mean_30m_alias(hours: int = 2, limit: int = 3):
-    return ingest_current_mean_10m(hours=hours, limit=limit)
+async def ingest_current_mean_30m_alias(hours: int = 2, limit: int = 3):
+    return await ingest_current_mean_10m(hours=hours, limit=limit)
@@ -1,112 +1,321 @@
 from typing import Sequence
+import functools
+from concurrent.futures import ThreadPoolExecutor
+import datetime as dt
 from loguru import logger
-from sqlalchemy import text
-from src.app.db.session import SessionLocal, CloudSessionLocal, cloud_engine
-from src.app.db.session import Base  # your metadata
+from pathlib import Path
+from alembic.script import ScriptDirectory
+from sqlalchemy import bindparam, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import ProgrammingError
+from src.app.config import settings
+from src.app.db.session import SessionLocal, CloudSessionLocal, engine, cloud_engine
+
+_SERIES = ("voltage_mean_10m", "current_mean_10m")
+_SERIES_COLS = "instrument_id, ts_utc, phase, value, unit"
+
+# Every statement is built once here, so each call reuses SQLAlchemy's compiled
+# form; psycopg 3 then server-prepares the ones that repeat (prepare_threshold).
+_HEALTH_SQL = text("select 1")
+_VERSION_SQL = text("SELECT version_num FROM alembic_version")
+_UNDEFINED_TABLE = "42P01"  # SQLSTATE undefined_table
+
+# the cloud schema is owned by the Alembic chain (`make cloud-upgrade`); /cloud/init only checks it
+_ALEMBIC_DIR = Path(__file__).resolve().parents[3] / "alembic"
 
 def cloud_health() -> tuple[bool, str]:
     if not cloud_engine:
         return (False, "disabled")
     try:
         with cloud_engine.connect() as c:
-            c.execute(text("select 1"))
+            c.execute(_HEALTH_SQL)
         return (True, "ok")
     except Exception as e:
         return (False, str(e))
 
-def cloud_init() -> None:
+def _schema_head() -> str | None:
+    return ScriptDirectory(str(_ALEMBIC_DIR)).get_current_head()
+
+def cloud_init() -> dict:
+    """
+    Check the cloud schema revision against the migration head. No DDL here:
+    `alembic -x target=cloud upgrade head` owns tables and indexes. At head,
+    (re)builds the postgres_fdw link when CLOUD_SYNC_FDW is on.
+    """
     if not cloud_engine:
         raise RuntimeError("Cloud sink not configured")
-    Base.metadata.create_all(bind=cloud_engine)
-    with cloud_engine.begin() as conn:
-        conn.execute(text("ALTER TABLE instrument ADD COLUMN IF NOT EXISTS meta JSONB;"))
-        conn.execute(text("""
-            CREATE UNIQUE INDEX IF NOT EXISTS uq_voltage_mean_10m
-            ON voltage_mean_10m (instrument_id, ts_utc, phase);
-        """))
-        conn.execute(text("""
-            CREATE UNIQUE INDEX IF NOT EXISTS uq_current_mean_10m
-            ON current_mean_10m (instrument_id, ts_utc, phase);
-        """))
+    head = _schema_head()
+    try:
+        with cloud_engine.connect() as conn:
+            version = conn.execute(_VERSION_SQL).scalar()
+    except ProgrammingError as e:
+        # only "never migrated" (no alembic_version table); connection/auth errors surface
+        if (getattr(e.orig, "sqlstate", None) or getattr(e.orig, "pgcode", None)) != _UNDEFINED_TABLE:
+            raise
+        version = None
+    ok = version is not None and version == head
+    if not ok:
+        logger.warning("Cloud schema at {} (head {}); run `make cloud-upgrade`", version, head)
+    elif settings.CLOUD_SYNC_FDW:
+        with cloud_engine.begin() as conn:
+            _init_fdw(conn)
+    return {"ok": ok, "version": version, "head": head}
 
-def _sync_one(table: str, since_hours: int) -> int:
-    if not CloudSessionLocal:
-        raise RuntimeError("Cloud sink not configured")
+# -------------------------
+# server-side sync (postgres_fdw)
+# -------------------------
+_FDW_SERVER = "s360_src"
+_FDW_SCHEMA = "src_fdw"
+
+def _lit(v) -> str:
+    """SQL string literal for DDL options (utility statements take no bind params)."""
+    # ':' escaped so text() doesn't read it as a bind
+    return "'" + str(v).replace("'", "''").replace(":", "\\:") + "'"
+
+def _init_fdw(conn) -> None:
+    """
+    Expose the source tables on the cloud DB as foreign tables in src_fdw.
+    Server, user mapping and imports are rebuilt on every run, so changed
+    connection settings take effect.
+    """
+    url = make_url(settings.CLOUD_FDW_SOURCE_URL or settings.DATABASE_URL)
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS postgres_fdw"))
+    conn.execute(text(f"DROP SERVER IF EXISTS {_FDW_SERVER} CASCADE"))
+    conn.execute(text(
+        f"CREATE SERVER {_FDW_SERVER} FOREIGN DATA WRAPPER postgres_fdw "
+        f"OPTIONS (host {_lit(url.host or 'localhost')}, port {_lit(url.port or 5432)}, dbname {_lit(url.database)})"
+    ))
+    conn.execute(text(
+        f"CREATE USER MAPPING FOR CURRENT_USER SERVER {_FDW_SERVER} "
+        f"OPTIONS (user {_lit(url.username)}, password {_lit(url.password or '')})"
+    ))
+    conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {_FDW_SCHEMA}"))
+    conn.execute(text(
+        f"IMPORT FOREIGN SCHEMA public LIMIT TO (instrument, voltage_mean_10m, current_mean_10m) "
+        f"FROM SERVER {_FDW_SERVER} INTO {_FDW_SCHEMA}"
+    ))
+    logger.info("postgres_fdw source {}:{} imported into {}", url.host, url.database, _FDW_SCHEMA)
+
+_FDW_SERIES_SQL = {
+    t: text(f"""
+        INSERT INTO {t} ({_SERIES_COLS})
+        SELECT {_SERIES_COLS}
+        FROM src_fdw.{t}
+        WHERE ts_utc >= :since
+        ON CONFLICT (instrument_id, ts_utc, phase) DO UPDATE
+        SET value=EXCLUDED.value, unit=EXCLUDED.unit
+    """)
+    for t in _SERIES
+}
+
+# DBs built from the models call it "metadata"; older ones "meta"
+_FDW_META_COL_SQL = text("""
+    SELECT column_name FROM information_schema.columns
+    WHERE table_schema = 'src_fdw' AND table_name = 'instrument'
+      AND column_name IN ('metadata', 'meta')
+    ORDER BY column_name = 'metadata' DESC
+    LIMIT 1
+""")
+
+_FDW_INSTRUMENT_SQL = {
+    col: text(f"""
+        INSERT INTO instrument (id, name, commissioned, meta)
+        SELECT id, name, commissioned, {f'{col}::jsonb' if col else 'NULL::jsonb'}
+        FROM src_fdw.instrument
+        ON CONFLICT (id) DO UPDATE
+        SET name=EXCLUDED.name,
+            commissioned=EXCLUDED.commissioned,
+            meta=EXCLUDED.meta
+    """)
+    for col in ("metadata", "meta", None)
+}
+
+def _sync_one_fdw(table: str, since_hours: int) -> int:
+    """One INSERT ... SELECT on the cloud DB; no rows pass through Python."""
+    with cloud_engine.begin() as dst:
+        if table == "instrument":
+            src_meta = dst.execute(_FDW_META_COL_SQL).scalar()
+            res = dst.execute(_FDW_INSTRUMENT_SQL[src_meta])
+        elif table in _FDW_SERIES_SQL:
+            # cutoff bound as a value: postgres_fdw won't ship now() to the
+            # source, so a server-side expression would pull the whole table
+            since = dt.datetime.now(dt.UTC) - dt.timedelta(hours=since_hours)
+            res = dst.execute(_FDW_SERIES_SQL[table], {"since": since})
+        else:
+            raise ValueError(f"Unsupported table: {table}")
+        return res.rowcount
+
+# -------------------------
+# binary COPY stream (psycopg 3 on both ends)
+# -------------------------
+# LIKE gives the stage the target's exact column types, which binary COPY
+# needs; temp = unlogged, and ON COMMIT DELETE ROWS empties it per sync
+_STAGE_DDL = {
+    t: text(f"CREATE TEMP TABLE IF NOT EXISTS {t}_sync_stage (LIKE {t}) ON COMMIT DELETE ROWS")
+    for t in _SERIES
+}
+_COPY_OUT_SQL = {
+    t: f"COPY (SELECT {_SERIES_COLS} FROM {t} WHERE ts_utc >= %s) TO STDOUT (FORMAT BINARY)"
+    for t in _SERIES
+}
+_COPY_IN_SQL = {t: f"COPY {t}_sync_stage ({_SERIES_COLS}) FROM STDIN (FORMAT BINARY)" for t in _SERIES}
+_STAGE_MERGE_SQL = {
+    t: text(f"""
+        INSERT INTO {t} ({_SERIES_COLS})
+        SELECT {_SERIES_COLS} FROM {t}_sync_stage
+        ON CONFLICT (instrument_id, ts_utc, phase) DO UPDATE
+        SET value=EXCLUDED.value, unit=EXCLUDED.unit
+    """)
+    for t in _SERIES
+}
+
+def _copy_series(table: str, since_hours: int) -> int:
+    """
+    COPY the recent window out of the source and into a temp stage on the cloud
+    DB as one binary stream (chunks are passed through, never decoded into
+    rows), then merge with one INSERT ... SELECT.
+    """
+    since = dt.datetime.now(dt.UTC) - dt.timedelta(hours=since_hours)
+    with SessionLocal() as src, CloudSessionLocal() as dst:
+        dst.execute(_STAGE_DDL[table])
+        src_raw = src.connection().connection.driver_connection
+        dst_raw = dst.connection().connection.driver_connection
+        with src_raw.cursor() as sc, dst_raw.cursor() as dc:
+            with sc.copy(_COPY_OUT_SQL[table], (since,)) as out, dc.copy(_COPY_IN_SQL[table]) as into:
+                for chunk in out:
+                    into.write(chunk)
+        n = dst.execute(_STAGE_MERGE_SQL[table]).rowcount
+        dst.commit()
+        return n
+
+# -------------------------
+# row path (any driver)
+# -------------------------
+_SYNC_BATCH = 10_000  # rows per executemany; also the source fetch size
+
+def _copy_rows(sel, ins, params: dict | None = None, raw_ins: str | None = None) -> int:
+    """
+    Read `sel` through a server-side cursor and write each _SYNC_BATCH slice
+    with `ins` as it arrives, so memory holds one batch, not the whole result.
+    One commit at the end.
 
-    if table == "instrument":
-        # detect whether source has 'meta' column
-        with SessionLocal() as src:
-            has_meta = src.execute(text("""
-                SELECT EXISTS (
-                SELECT 1 FROM information_schema.columns
-                WHERE table_name='instrument' AND column_name='meta'
-                ) AS ok
-            """)).scalar()
-
-        sel = text(
-            "SELECT id, name, commissioned, meta FROM instrument"
-            if has_meta else
-            "SELECT id, name, commissioned, NULL::jsonb AS meta FROM instrument"
+    With a psycopg 3 target and a `raw_ins` (%(name)b placeholders), batches go
+    straight to the driver's executemany instead: binary parameters (no
+    float/timestamp -> text -> parse round trip) sent in pipeline mode.
+    """
+    n = 0
+    with SessionLocal() as src, CloudSessionLocal() as dst:
+        raw = None
+        if raw_ins is not None and cloud_engine.dialect.driver == "psycopg":
+            raw = dst.connection().connection.driver_connection
+        result = src.execute(
+            sel, params or {},
+            execution_options={"stream_results": True, "yield_per": _SYNC_BATCH},
         )
+        for batch in result.mappings().partitions():
+            if raw is not None:
+                with raw.cursor() as cur:
+                    cur.executemany(raw_ins, batch)
+            else:
+                dst.execute(ins, batch)
+            n += len(batch)
+        dst.commit()
+    return n
+
+# detect whether source has 'meta' column
+# the ORM maps Instrument.meta to a column named "metadata"; older source DBs used "meta"
+_SRC_META_COL_SQL = text("""
+    SELECT column_name FROM information_schema.columns
+    WHERE table_schema = current_schema() AND table_name = 'instrument'
+      AND column_name IN ('metadata', 'meta')
+    ORDER BY column_name = 'metadata' DESC
+    LIMIT 1
+""")
+
+# meta is typed on both ends: plain text() binds have no JSON processing, and
+# drivers can't adapt the dicts a jsonb column reads back as
+_INSTRUMENT_SEL = {
+    col: text(f"SELECT id, name, commissioned, {col or 'NULL::jsonb'} AS meta FROM instrument").columns(meta=JSONB)
+    for col in ("metadata", "meta", None)
+}
+
+_INSTRUMENT_INS = text("""
+    INSERT INTO instrument (id, name, commissioned, meta)
+    VALUES (:id, :name, :commissioned, :meta)
+    ON CONFLICT (id) DO UPDATE
+    SET name=EXCLUDED.name,
+        commissioned=EXCLUDED.commissioned,
+        meta=EXCLUDED.meta;
+""").bindparams(bindparam("meta", type_=JSONB(none_as_null=True)))  # None stays SQL NULL, not 'null'
 
-        ins = text("""
-            INSERT INTO instrument (id, name, commissioned, meta)
-            VALUES (:id, :name, :commissioned, :meta)
-            ON CONFLICT (id) DO UPDATE
-            SET name=EXCLUDED.name,
-                commissioned=EXCLUDED.commissioned,
-                meta=EXCLUDED.meta;
-        """)
-
-        # ensure target has 'meta'
-        with CloudSessionLocal() as dst:
-            dst.execute(text("ALTER TABLE instrument ADD COLUMN IF NOT EXISTS meta JSONB;"))
-            dst.commit()
-
-        with SessionLocal() as src, CloudSessionLocal() as dst:
-            rows = src.execute(sel).mappings().all()
-            if not rows:
-                return 0
-            dst.execute(ins, rows)
-            dst.commit()
-            return len(rows)
-    elif table == "voltage_mean_10m":
-        sel = text("""
-            select instrument_id, ts_utc, phase, value, unit
-            from voltage_mean_10m
+# table -> (select recent window, upsert one row, same upsert for the raw psycopg cursor)
+_SERIES_SQL = {
+    t: (
+        text(f"""
+            select {_SERIES_COLS}
+            from {t}
             where ts_utc >= now() - (:h || ' hours')::interval
-        """)
-        ins = text("""
-            INSERT INTO voltage_mean_10m (instrument_id, ts_utc, phase, value, unit)
+        """),
+        text(f"""
+            INSERT INTO {t} ({_SERIES_COLS})
             VALUES (:instrument_id, :ts_utc, :phase, :value, :unit)
             ON CONFLICT (instrument_id, ts_utc, phase) DO UPDATE
             SET value=EXCLUDED.value, unit=EXCLUDED.unit;
-        """)
-    elif table == "current_mean_10m":
-        sel = text("""
-            select instrument_id, ts_utc, phase, value, unit
-            from current_mean_10m
-            where ts_utc >= now() - (:h || ' hours')::interval
-        """)
-        ins = text("""
-            INSERT INTO current_mean_10m (instrument_id, ts_utc, phase, value, unit)
-            VALUES (:instrument_id, :ts_utc, :phase, :value, :unit)
+        """),
+        f"""
+            INSERT INTO {t} ({_SERIES_COLS})
+            VALUES (%(instrument_id)b, %(ts_utc)b, %(phase)b, %(value)b, %(unit)b)
             ON CONFLICT (instrument_id, ts_utc, phase) DO UPDATE
-            SET value=EXCLUDED.value, unit=EXCLUDED.unit;
-        """)
-    else:
-        raise ValueError(f"Unsupported table: {table}")
+            SET value=EXCLUDED.value, unit=EXCLUDED.unit
+        """,
+    )
+    for t in _SERIES
+}
 
-    with SessionLocal() as src, CloudSessionLocal() as dst:
-        rows = src.execute(sel, {"h": since_hours}).mappings().all()
-        if not rows:
-            return 0
-        dst.execute(ins, rows)
-        dst.commit()
-        return len(rows)
+@functools.lru_cache(maxsize=1)
+def _src_meta_col() -> str | None:
+    """Source column holding the vendor record; probed once per process."""
+    with SessionLocal() as src:
+        return src.execute(_SRC_META_COL_SQL).scalar()
+
+def _sync_instrument(since_hours: int) -> int:
+    # whole table: instruments aren't time-windowed; the target's meta column comes from 0003
+    return _copy_rows(_INSTRUMENT_SEL[_src_meta_col()], _INSTRUMENT_INS)
+
+def _sync_series(table: str, since_hours: int) -> int:
+    if engine.dialect.driver == "psycopg" and cloud_engine.dialect.driver == "psycopg":
+        return _copy_series(table, since_hours)
+
+    # source isn't psycopg 3 (no COPY stream); the target may still take binary params
+    sel, ins, raw_ins = _SERIES_SQL[table]
+    return _copy_rows(sel, ins, {"h": since_hours}, raw_ins)
+
+_TABLE_HANDLERS = {
+    "instrument": _sync_instrument,
+    **{t: functools.partial(_sync_series, t) for t in _SERIES},
+}
+SYNC_TABLES = frozenset(_TABLE_HANDLERS)
+
+def _sync_one(table: str, since_hours: int) -> int:
+    if not CloudSessionLocal:
+        raise RuntimeError("Cloud sink not configured")
+    handler = _TABLE_HANDLERS.get(table)
+    if handler is None:
+        raise ValueError(f"Unsupported table: {table}")
+    if settings.CLOUD_SYNC_FDW:
+        return _sync_one_fdw(table, since_hours)
+    return handler(since_hours)
 
 def sync(tables: Sequence[str], since_hours: int = 24) -> dict[str, int]:
-    out = {}
-    for t in tables:
-        out[t] = _sync_one(t, since_hours)
-    return out
+    """
+    Sync each table on its own worker thread: they share no rows or indexes,
+    so their round trips overlap. Each worker holds one source and one cloud
+    connection (both pools are sized well above the three tables).
+    """
+    todo = list(dict.fromkeys(tables))
+    if not todo:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(todo)) as ex:
+        futures = {t: ex.submit(_sync_one, t, since_hours) for t in todo}
+        return {t: f.result() for t, f in futures.items()}
@@ -0,0 +1,44 @@
+import httpx
+import pytest
+
+from src.app.clients import substation360 as s360
+from src.app.config import settings
+
+@pytest.fixture
+def auth_requests(monkeypatch):
+    """Shared client on a mock transport, already carrying a stale bearer."""
+    seen: list[httpx.Request] = []
+    status = {"first": 200}
+
+    def handler(req: httpx.Request) -> httpx.Response:
+        seen.append(req)
+        if req.url == httpx.URL(settings.S360_AUTH_URL):
+            code = status["first"] if len(seen) == 1 else 200
+            if code != 200:
+                return httpx.Response(code, text="Unsupported Media Type")
+            return httpx.Response(200, json={"access_token": "new", "expires_in": 600})
+        return httpx.Response(200, json=[])
+
+    client = httpx.Client(transport=httpx.MockTransport(handler), headers={"Accept": "application/json"})
+    s360._use_token(client, "stale")
+    monkeypatch.setattr(s360, "_CLIENT", client)
+    yield seen, status
+    client.close()
+
+def test_token_post_sends_no_bearer(auth_requests):
+    seen, _ = auth_requests
+    token, exp = s360._fetch_token()
+    assert token == "new" and exp is not None
+    (req,) = seen
+    assert "authorization" not in req.headers
+    assert req.headers["content-type"].startswith("multipart/form-data")
+    # later telemetry calls carry the new bearer
+    s360.list_instruments(token)
+    assert seen[-1].headers["authorization"] == "Bearer new"
+
+def test_urlencoded_fallback_sends_no_bearer(auth_requests):
+    seen, status = auth_requests
+    status["first"] = 415
+    assert s360._fetch_token()[0] == "new"
+    assert [r.headers.get("authorization") for r in seen] == [None, None]
+    assert seen[1].headers["content-type"] == "application/x-www-form-urlencoded"
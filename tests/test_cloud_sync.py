@@ -0,0 +1,67 @@
+import contextlib
+
+import psycopg.errors
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.orm import sessionmaker
+
+from src.app.sync import cloud
+
+@pytest.fixture
+def cloud_db(monkeypatch):
+    # sqlite stand-in for the cloud sink
+    engine = create_engine("sqlite://")
+    monkeypatch.setattr(cloud, "cloud_engine", engine)
+    return engine
+
+def test_cloud_init_reports_head(cloud_db):
+    head = cloud._schema_head()
+    with cloud_db.begin() as c:
+        c.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32))"))
+        c.execute(text("INSERT INTO alembic_version VALUES ('0002')"))
+    assert cloud.cloud_init() == {"ok": False, "version": "0002", "head": head}
+    with cloud_db.begin() as c:
+        c.execute(text("UPDATE alembic_version SET version_num = :v"), {"v": head})
+    assert cloud.cloud_init() == {"ok": True, "version": head, "head": head}
+
+class _NoVersionTable:
+    """Engine whose first query fails the way Postgres does on a never-migrated DB."""
+    @contextlib.contextmanager
+    def connect(self):
+        raise ProgrammingError("SELECT version_num FROM alembic_version", {},
+                               psycopg.errors.UndefinedTable("relation \"alembic_version\" does not exist"))
+        yield
+
+def test_cloud_init_never_migrated(monkeypatch):
+    monkeypatch.setattr(cloud, "cloud_engine", _NoVersionTable())
+    assert cloud.cloud_init() == {"ok": False, "version": None, "head": cloud._schema_head()}
+
+def test_cloud_init_surfaces_connection_errors(monkeypatch, tmp_path):
+    monkeypatch.setattr(cloud, "cloud_engine", create_engine(f"sqlite:///{tmp_path}/missing/dir/x.db"))
+    with pytest.raises(OperationalError):
+        cloud.cloud_init()
+
+def test_sync_instrument_carries_metadata(monkeypatch):
+    # sqlite stand-ins for both ends; sqlite3, like psycopg 3, can't bind a raw dict
+    src, dst = create_engine("sqlite://"), create_engine("sqlite://")
+    with src.begin() as c:
+        c.execute(text("CREATE TABLE instrument (id BIGINT PRIMARY KEY, name TEXT, commissioned BOOLEAN, metadata JSON)"))
+        c.execute(text("""INSERT INTO instrument VALUES (1, 'a', 1, '{"tag": "T-1", "ids": [1, 2]}'), (2, 'b', 0, NULL)"""))
+    with dst.begin() as c:
+        c.execute(text("CREATE TABLE instrument (id BIGINT PRIMARY KEY, name TEXT, commissioned BOOLEAN, meta JSON)"))
+    monkeypatch.setattr(cloud, "SessionLocal", sessionmaker(bind=src))
+    monkeypatch.setattr(cloud, "CloudSessionLocal", sessionmaker(bind=dst))
+    monkeypatch.setattr(cloud, "_src_meta_col", lambda: "metadata")
+
+    assert cloud._sync_instrument(24) == 2
+    with dst.connect() as c:
+        rows = c.execute(text("SELECT id, meta FROM instrument ORDER BY id")).all()
+    assert rows == [(1, '{"tag": "T-1", "ids": [1, 2]}'), (2, None)]
+
+    # what a Postgres source hands over: jsonb already decoded to a dict
+    with sessionmaker(bind=dst)() as s:
+        s.execute(cloud._INSTRUMENT_INS, [{"id": 3, "name": "c", "commissioned": True, "meta": {"tag": "T-3"}}])
+        s.commit()
+    with dst.connect() as c:
+        assert c.execute(text("SELECT meta FROM instrument WHERE id = 3")).scalar() == '{"tag": "T-3"}'
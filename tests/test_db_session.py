@@ -0,0 +1,14 @@
+import pytest
+
+from src.app.db import session
+
+@pytest.mark.parametrize("url, keepalives", [
+    ("postgresql+psycopg://u:p@h/db", True),
+    ("postgresql://u:p@h/db", True),  # default driver: psycopg2
+    ("postgresql+asyncpg://u:p@h/db", False),
+    ("sqlite:///x.db", False),
+])
+def test_keepalives_only_for_libpq_drivers(url, keepalives):
+    kw = session._engine_kwargs(url)
+    assert ("connect_args" in kw) is keepalives
+    assert kw["pool_size"] == session._POOL["pool_size"]
@@ -0,0 +1,81 @@
+import random
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from src.app import main
+from src.app.main import _iid, _iname, _ID_KEYS
+
+# Reference: the .get()-chain versions the `in`-probe lookups replaced
+def _ref_iid(i: dict):
+    for k in _ID_KEYS:
+        v = i.get(k)
+        if v is not None:
+            try:
+                return int(v)
+            except Exception:
+                return None
+    return None
+
+def _ref_iname(i: dict, iid):
+    name = (
+        i.get("name")
+        or i.get("instrumentName")
+        or i.get("assetName")
+        or i.get("displayName")
+        or (i.get("transformerAssetTag") or "").strip()
+    )
+    if name:
+        return name
+    return f"instrument-{iid}" if iid is not None else None
+
+def _outcome(fn, *args):
+    try:
+        return fn(*args)
+    except Exception as e:  # e.g. a non-str transformerAssetTag has no .strip()
+        return type(e)
+
+@pytest.mark.parametrize("rec, expected", [
+    ({"instrumentId": "42"}, 42),
+    ({"instrumentId": None, "id": 7}, 7),
+    ({"deviceId": 3, "AssetId": 9}, 3),
+    ({"instrumentId": "abc", "id": 7}, None),  # first non-null key decides, even if unusable
+    ({"name": "x"}, None),
+])
+def test_iid_examples(rec, expected):
+    assert _iid(rec) == expected
+
+@pytest.mark.parametrize("rec, iid, expected", [
+    ({"name": "Sub A"}, 1, "Sub A"),
+    ({"name": "", "assetName": "Tx 2"}, 1, "Tx 2"),
+    ({"transformerAssetTag": "  T-9 "}, 1, "T-9"),
+    ({}, 5, "instrument-5"),
+    ({}, None, None),
+])
+def test_iname_examples(rec, iid, expected):
+    assert _iname(rec, iid) == expected
+
+_KEYS = list(_ID_KEYS) + ["name", "instrumentName", "assetName", "displayName", "transformerAssetTag", "other"]
+_VALS = [None, "", "  ", 0, 12, "34", "x", " tag ", 1.9]
+
+def test_iid_iname_match_reference():
+    rng = random.Random(11)
+    for _ in range(50_000):
+        rec = {k: rng.choice(_VALS) for k in rng.sample(_KEYS, rng.randint(0, 6))}
+        iid = _iid(rec)
+        assert iid == _ref_iid(rec), rec
+        assert _outcome(_iname, rec, iid) == _outcome(_ref_iname, rec, iid), rec
+
+def test_upsert_instruments_past_the_bind_parameter_limit(monkeypatch):
+    # sqlite stand-in (no JSONB DDL there); 20k instruments x 4 binds is over any one-statement limit
+    engine = create_engine("sqlite://")
+    with engine.begin() as c:
+        c.execute(text("CREATE TABLE instrument (id BIGINT PRIMARY KEY, name TEXT, commissioned BOOLEAN, metadata JSON)"))
+    monkeypatch.setattr(main, "SessionLocal", sessionmaker(bind=engine))
+    inst = [{"instrumentId": i, "name": f"n{i}"} for i in range(20_000)] + [{"instrumentId": 1, "name": "last"}]
+    assert main._upsert_instruments(inst) == 20_000
+    with engine.connect() as c:
+        assert c.execute(text("SELECT count(*) FROM instrument")).scalar() == 20_000
+        assert c.execute(text("SELECT name, metadata FROM instrument WHERE id = 1")).one() == (
+            "last", '{"instrumentId": 1, "name": "last"}')
@@ -0,0 +1,21 @@
+import io
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+
+_ROOT = Path(__file__).resolve().parents[1]
+
+def _offline_sql() -> str:
+    buf = io.StringIO()
+    cfg = Config(str(_ROOT / "alembic.ini"), output_buffer=buf)
+    cfg.set_main_option("script_location", str(_ROOT / "alembic"))
+    command.upgrade(cfg, "head", sql=True)
+    return buf.getvalue()
+
+def test_offline_upgrade_emits_fresh_database_ddl():
+    sql = _offline_sql()
+    assert "CREATE TABLE instrument" in sql and "metadata JSONB" in sql
+    assert "CREATE TABLE voltage_mean_10m" in sql
+    assert "brin_voltage_mean_10m_ts" in sql
+    assert "ADD COLUMN IF NOT EXISTS meta" not in sql  # 0003 only applies to the cloud target
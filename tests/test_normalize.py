@@ -0,0 +1,98 @@
+import datetime as dt
+import random
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from src.app.db.models import VoltageMean10m
+from src.app.ingest import normalize as nz
+
+def _mapped(points) -> list[tuple]:
+    """What _map_points keeps from each (point, iid, unit): phase rows in order."""
+    out = []
+    for p, iid, unit in points:
+        ts = nz._detect_ts(p)
+        for ph, val in nz._phase_values(p):
+            out.append((iid, ts, ph, val, unit))
+    return out
+
+def _reference(rows) -> list[tuple]:
+    return _mapped(nz._with_ids(nz._walk_points(rows)))
+
+def _point(rng: random.Random, depth: int = 0) -> dict:
+    p = {"time": f"2024-01-01T00:{rng.randint(0, 59):02d}:00Z"}
+    for k in rng.sample(["subjectAssetName", "numericData", "value", "unit", "instrumentId", "voltageL2"], 3):
+        p[k] = {"subjectAssetName": rng.choice(["L1", "L2", "TOTAL"]), "unit": rng.choice(["V", ""]),
+                "instrumentId": rng.choice([5, None])}.get(k, rng.choice([1, "2.5", None]))
+    if depth < 2 and rng.random() < 0.15:
+        p[rng.choice(["children", "values"])] = [_point(rng, depth + 1) for _ in range(rng.randint(1, 2))]
+    return p
+
+def _payload(rng: random.Random) -> list:
+    rows = []
+    for _ in range(rng.randint(1, 6)):
+        if rng.random() < 0.5:
+            rows.append(_point(rng))
+        else:
+            parent = {"instrumentId": rng.choice([1, 2, "3", None]), "values": [_point(rng) for _ in range(3)]}
+            if rng.random() < 0.3:
+                parent["unit"] = "A"
+            if rng.random() < 0.1:
+                parent["extra"] = {"time": "2024-01-02T00:00:00Z", "value": 9}
+            rows.append(parent)
+    return rows
+
+def test_nested_children_of_later_rows_are_kept():
+    rows = [{"time": "t1", "value": 1}, {"time": "t2", "value": 2, "children": [{"time": "t3", "value": 3}]}]
+    assert nz._is_fast_shape(rows)
+    assert len(_mapped(nz._iter_points(rows))) == 3
+    assert _mapped(nz._iter_points(rows)) == _reference(rows)
+
+@pytest.mark.parametrize("rows", [
+    # later parent with a nested non-values key
+    [{"instrumentId": 1, "values": [{"time": "t1", "value": 1}]},
+     {"instrumentId": 2, "meta": {"time": "t9", "value": 9}, "values": [{"time": "t2", "value": 2}]}],
+    # values[] point carrying a sub-list
+    [{"instrumentId": 1, "unit": "V", "values": [{"time": "t1", "value": 1},
+                                                 {"time": "t2", "value": 2, "sub": [{"time": "t3", "value": 3}]}]}],
+    # non-dict row and a row without values
+    [{"time": "t1", "value": 1}, [{"time": "t2", "value": 2}], {"instrumentId": 4}],
+])
+def test_fast_walk_matches_recursive_walk(rows):
+    assert _mapped(nz._iter_points(rows)) == _reference(rows)
+
+def test_fast_walk_matches_recursive_walk_random():
+    rng = random.Random(3)
+    for _ in range(5_000):
+        rows = _payload(rng)
+        assert _mapped(nz._iter_points(rows)) == _reference(rows), rows
+
+@pytest.fixture
+def silver_session():
+    # sqlite stand-in: exercises the executemany upsert (COPY needs psycopg 3)
+    engine = create_engine("sqlite://")
+    VoltageMean10m.__table__.create(engine)
+    with Session(engine) as s:
+        yield s
+
+def test_upsert_folds_duplicates_and_updates(silver_session):
+    t0 = "2024-01-01T00:00:00Z"  # mapped rows carry _detect_ts strings
+    rows = [(1, t0, "A", 1.0, "V"), (1, t0, "A", 2.0, "V"), (2, t0, "B", 3.0, "V")]
+    assert nz._upsert(silver_session, "voltage_mean_10m", rows) == 3
+    nz._upsert(silver_session, "voltage_mean_10m", [(2, t0, "B", 4.0, "kV")])
+    silver_session.commit()
+    tbl = VoltageMean10m.__table__
+    got = silver_session.execute(select(tbl.c.instrument_id, tbl.c.value, tbl.c.unit).order_by(tbl.c.instrument_id)).all()
+    assert got == [(1, 2.0, "V"), (2, 4.0, "kV")]
+
+def test_typed_rows_reads_naive_timestamps_as_utc():
+    got = nz._typed_rows([(1, "2024-01-01T00:00:00", "A", 1.0, "V"), (1, "2024-01-01T01:00:00+01:00", "B", 1.0, "V")])
+    assert [r[1] for r in got] == [dt.datetime(2024, 1, 1, tzinfo=dt.UTC)] * 2
+    assert nz._typed_rows([(1, "01/01/2024 00:00", "A", 1.0, "V")]) is None
+
+def test_upsert_treats_naive_and_utc_strings_as_one_instant(silver_session):
+    rows = [(1, "2024-01-01T00:00:00", "A", 1.0, "V"), (1, "2024-01-01T00:00:00Z", "A", 2.0, "V")]
+    nz._upsert(silver_session, "voltage_mean_10m", rows)
+    tbl = VoltageMean10m.__table__
+    assert silver_session.execute(select(tbl.c.value)).scalars().all() == [2.0]
@@ -0,0 +1,126 @@
+import os
+import random
+import re
+
+import pytest
+
+from src.app.ingest import _normalize_hot as hot
+
+# Reference: the per-pattern search chain _PHASE_ONE replaced (L1|A, then L2|B, then L3|C)
+_REF_CHAIN = (
+    ("A", re.compile(r'(?:^|[^a-z0-9])l1(?:[^a-z0-9]|$)|voltagel1|currentl1|^l1|l1$', re.I),
+          re.compile(r'(^|[^a-z0-9])phase?\s*a([^a-z0-9]|$)|voltage.*a|current.*a|(^|[^a-z0-9])a([^a-z0-9]|$)', re.I)),
+    ("B", re.compile(r'(?:^|[^a-z0-9])l2(?:[^a-z0-9]|$)|voltagel2|currentl2|^l2|l2$', re.I),
+          re.compile(r'(^|[^a-z0-9])phase?\s*b([^a-z0-9]|$)|voltage.*b|current.*b|(^|[^a-z0-9])b([^a-z0-9]|$)', re.I)),
+    ("C", re.compile(r'(?:^|[^a-z0-9])l3(?:[^a-z0-9]|$)|voltagel3|currentl3|^l3|l3$', re.I),
+          re.compile(r'(^|[^a-z0-9])phase?\s*c([^a-z0-9]|$)|voltage.*c|current.*c|(^|[^a-z0-9])c([^a-z0-9]|$)', re.I)),
+)
+
+def _ref_phase_of_key(key) -> str | None:
+    k = str(key).lower()
+    for ph, pl, pa in _REF_CHAIN:
+        if pl.search(k) or pa.search(k):
+            return ph
+    return None
+
+def _ref_phase_values(d: dict) -> list[tuple[str, float]]:
+    out = []
+    subj = d.get("subjectAssetName") or d.get("subjectPhaseName") or d.get("channelName")
+    if subj:
+        ph = hot._phase_from_subject(subj)
+        val = hot._numeric_value(d)
+        if ph and val is not None:
+            return [(ph, val)]
+    ph = d.get("phase") or d.get("Phase") or d.get("PHASE")
+    if ph:
+        val = hot._numeric_value(d)
+        if val is not None:
+            return [(str(ph).strip().upper().replace("L", ""), val)]
+    for key, raw in d.items():
+        if raw is None:
+            continue
+        try:
+            f = float(raw)
+        except Exception:
+            continue
+        ph = _ref_phase_of_key(key)
+        if ph:
+            out.append((ph, f))
+    v = hot._numeric_value(d)
+    if not out and v is not None:
+        out.append(("TOTAL", v))
+    return out
+
+# fragments that exercise every branch: l1..l3 at edges/glued, phase a/b/c, voltage/current prefixes
+_FRAGS = ["l1", "l2", "l3", "L1", "a", "b", "c", "phase", "phas", "voltage", "current",
+          "_", "-", " ", "x", "9", "mean", "value", "Total", "numeric", "data", "e"]
+
+def _random_key(rng: random.Random) -> str:
+    return "".join(rng.choice(_FRAGS) for _ in range(rng.randint(1, 5)))
+
+@pytest.mark.skipif(not os.environ.get("EXPECT_COMPILED_HOT"), reason="pure-Python leg")
+def test_hot_module_is_compiled():
+    # the CI `compiled` leg must not silently fall back to the .py module
+    assert not hot.__file__.endswith(".py"), hot.__file__
+
+@pytest.fixture(autouse=True)
+def _fresh_memo():
+    hot._KEY_PHASE.clear()
+    yield
+    hot._KEY_PHASE.clear()
+
+@pytest.mark.parametrize("key, phase", [
+    ("voltageL1", "A"), ("currentL2", "B"), ("l3", "C"), ("L1_current", "A"),
+    ("phase_a", "A"), ("Phase B", "B"), ("phase-c", "C"),
+    ("voltage_mean", "A"),  # 'voltage.*a' branch: legacy behaviour, kept as-is
+    ("mean", None), ("dataValue", None), ("time", None),
+])
+def test_phase_of_key_examples(key, phase):
+    assert hot._phase_of_key(key) == phase
+    assert hot._phase_of_key(key) == phase  # second call served from the memo
+
+def test_phase_of_key_matches_reference_chain():
+    rng = random.Random(20240501)
+    for _ in range(50_000):
+        key = _random_key(rng)
+        assert hot._phase_of_key(key) == _ref_phase_of_key(key), key
+
+def test_phase_of_key_memo_is_bounded():
+    for n in range(hot._KEY_PHASE_MAX + 10):
+        hot._phase_of_key(f"k{n}")
+    assert len(hot._KEY_PHASE) <= hot._KEY_PHASE_MAX
+
+@pytest.mark.parametrize("name, phase", [
+    ("L1", "L1"), (" phase a ", "L1"), ("b", "L2"), ("Phase C", "L3"),
+    ("3-phase", "TOTAL"), ("all", "TOTAL"), ("neutral", None), (3, None),
+])
+def test_phase_from_subject(name, phase):
+    assert hot._phase_from_subject(name) == phase
+
+def test_numeric_value_keeps_zero_and_skips_junk():
+    assert hot._numeric_value({"numericData": 0}) == 0.0
+    assert hot._numeric_value({"numericData": "", "value": "n/a", "mean": "2.5"}) == 2.5
+    assert hot._numeric_value({"other": 1}) is None
+
+@pytest.mark.parametrize("point, expected", [
+    ({"subjectAssetName": "L2", "numericData": 231.5}, [("L2", 231.5)]),
+    ({"phase": "L3", "mean": "12"}, [("3", 12.0)]),
+    ({"time": "t", "phase": 1, "value": 3}, [("1", 3.0)]),  # non-str phase (mypyc rejected it as str | None)
+    ({"voltageL1": 1, "voltageL2": 2, "voltageL3": None, "time": "t"}, [("A", 1.0), ("B", 2.0)]),
+    ({"value": 7}, [("TOTAL", 7.0)]),
+    ({"subjectAssetName": "neutral", "numericData": 1}, [("TOTAL", 1.0)]),
+    ({"time": "t"}, []),
+])
+def test_phase_values_examples(point, expected):
+    assert hot._phase_values(point) == expected
+
+def test_phase_values_matches_reference():
+    rng = random.Random(7)
+    vals = [None, "", 0, 1.5, "2", "x", True]
+    for _ in range(20_000):
+        d = {_random_key(rng): rng.choice(vals) for _ in range(rng.randint(0, 4))}
+        if rng.random() < 0.2:
+            d["subjectAssetName"] = rng.choice(["L1", "phase b", "TOTAL", "n", ""])
+        if rng.random() < 0.2:
+            d["phase"] = rng.choice(["L1", "b", "", 1, 2.0])
+        assert hot._phase_values(d) == _ref_phase_values(d), d
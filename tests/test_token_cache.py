@@ -0,0 +1,101 @@
+import os
+import threading
+import time
+
+import orjson
+import pytest
+
+from src.app.clients import substation360 as s360
+from src.app.config import settings
+
+@pytest.fixture
+def cache_path(tmp_path, monkeypatch):
+    path = tmp_path / "s360" / "token.json"
+    monkeypatch.setattr(settings, "S360_TOKEN_CACHE_PATH", str(path))
+    monkeypatch.setattr(settings, "S360_USERNAME", "user")
+    monkeypatch.setattr(s360, "_use_token", lambda client, token: None)
+    s360._TOKEN_MEM.clear()
+    yield path
+    s360._TOKEN_MEM.clear()
+
+@pytest.fixture
+def fetches(monkeypatch):
+    """Stub auth: counts calls, returns a token valid for an hour."""
+    calls = []
+    def fake_fetch():
+        calls.append(1)
+        return f"fresh-{len(calls)}", time.time() + 3600
+    monkeypatch.setattr(s360, "_fetch_token", fake_fetch)
+    return calls
+
+def _write(path, data) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(orjson.dumps(data))
+
+def _entry(**over) -> dict:
+    return {"username": "user", "auth_url": settings.S360_AUTH_URL, "token": "cached",
+            "exp": time.time() + 3600, **over}
+
+def test_valid_cache_file_is_reused(cache_path, fetches):
+    _write(cache_path, _entry())
+    assert s360.get_token() == "cached"
+    assert fetches == []
+
+@pytest.mark.parametrize("content", [
+    b"null", b"[1]", b'"token"', b"{not json",
+    orjson.dumps(_entry(exp="soon")),
+    orjson.dumps(_entry(exp=[1])),
+    orjson.dumps(_entry(token=None)),
+    orjson.dumps(_entry(token=123)),
+    orjson.dumps(_entry(exp=time.time() + 10)),  # inside _TOKEN_SKEW
+    orjson.dumps(_entry(username="someone-else")),
+])
+def test_bad_or_stale_cache_file_is_a_miss(cache_path, fetches, content):
+    cache_path.parent.mkdir(parents=True)
+    cache_path.write_bytes(content)
+    assert s360.get_token() == "fresh-1"
+    assert fetches == [1]
+    # the refresh replaced the file, so the next process reads it back
+    s360._TOKEN_MEM.clear()
+    assert s360.get_token() == "fresh-1"
+    assert fetches == [1]
+
+def test_written_cache_file_is_private(cache_path, fetches):
+    s360.get_token()
+    assert os.stat(cache_path).st_mode & 0o777 == 0o600
+    assert orjson.loads(cache_path.read_bytes())["token"] == "fresh-1"
+
+def test_memory_cache_skips_the_file(cache_path, fetches, monkeypatch):
+    assert s360.get_token() == "fresh-1"
+    monkeypatch.setattr(s360, "_get_token_shared", lambda: pytest.fail("disk layer hit"))
+    assert s360.get_token() == "fresh-1"
+
+def test_memory_cache_refreshes_near_expiry(cache_path, fetches):
+    key = (settings.S360_USERNAME, str(settings.S360_AUTH_URL))
+    s360._TOKEN_MEM[key] = ("old", time.time() + s360._TOKEN_MEM_SKEW - 1)
+    assert s360.get_token() == "fresh-1"
+
+def test_concurrent_callers_share_one_refresh(cache_path, monkeypatch):
+    calls = []
+    def slow_fetch():
+        calls.append(1)
+        time.sleep(0.05)
+        return "fresh", time.time() + 3600
+    monkeypatch.setattr(s360, "_fetch_token", slow_fetch)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(s360.get_token())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == ["fresh"] * 8
+    assert len(calls) == 1
+
+def test_unwritable_cache_falls_back_to_auth(tmp_path, monkeypatch, fetches):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    monkeypatch.setattr(settings, "S360_TOKEN_CACHE_PATH", str(blocker / "token.json"))  # parent is a file
+    monkeypatch.setattr(s360, "_use_token", lambda client, token: None)
+    s360._TOKEN_MEM.clear()
+    assert s360.get_token() == "fresh-1"
+    s360._TOKEN_MEM.clear()